@@ -0,0 +1,515 @@
+#!env/bin/python3.7
+
+"""Benchmarks of the ASAR solver
+
+Usage:
+    python3 benchmark.py memory <input files>
+        Prints the memory used per search node (node plus state) for each input file
+    python3 benchmark.py engines <input files> [--engines astar idastar] [--timeout seconds]
+        Compares the wall time and peak RSS of the search engines on each input file
+    python3 benchmark.py scaling [--workers 1 2 4 8] [--planes 3] [--legs-per-plane 4] [--airports 5] [--tightness 0]
+                                 [--seeds 0 1 2]
+        Compares the wall time of the parallel hda engine with each number of workers (and of astar) on synthetic
+        instances. The default ones take astar 2 to 7 seconds (60k to 230k expanded nodes), so that starting the
+        workers and passing nodes between them do not dominate; with 16 legs (e.g. --planes 4 --airports 6) astar
+        takes minutes and gigabytes
+    python3 benchmark.py startup [--module solution] [--repeat 5] [--top 15]
+        Measures the startup time of a new process importing the solver, and the import time of the slowest modules
+        (with python -X importtime)
+    python3 benchmark.py suite [<input files>] [--engine astar] [--repeat 3] [--timeout seconds] [--output file]
+        Solves the bundled instances (input/ and private_tests/) and generated scaling instances, each one in a new
+        process, and saves the wall time, nodes expanded, peak RSS and profit of each one in a JSON results file
+        (log/benchmark-<commit>.json by default)
+    python3 benchmark.py compare <old results> <new results> [--threshold 0.1]
+        Compares two results files, flagging the instances that got slower, expanded more nodes, used more memory or
+        changed their profit. Exits with status 1 if any did
+    python3 benchmark.py run <input file> [--engine astar] [--workers n]
+        Solves one input file and prints its measurements as JSON (used by engines and scaling, in a separate process)
+"""
+
+import argparse
+import compileall
+import datetime
+import glob
+import json
+import os.path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import generator
+import search
+import solution
+from utils import inf, print_table
+
+# The bundled instances
+INSTANCES = sorted(glob.glob('input/*.txt')) + sorted(glob.glob('private_tests/*.txt'))
+
+# Generated scaling instances of the suite, as generator.generate arguments (planes, legs per plane, airports, seed)
+SYNTHETIC = [(2, 3, 4, 0), (2, 4, 4, 0), (3, 3, 4, 0), (3, 3, 4, 1), (3, 4, 5, 0)]
+
+# Version of the results files written by suite
+RESULTS_VERSION = 1
+
+
+def load_problem(filename, **kwargs):
+    """Loads an ASAR problem from a file
+
+    Parameters
+    ----------
+    filename : string
+    kwargs : dictionary
+        Arguments given to the ASARProblem constructor
+
+    Returns
+    -------
+    p : ASARProblem
+    """
+
+    p = solution.ASARProblem(**kwargs)
+    with open(filename, 'r') as f:
+        p.load(f)
+    return p
+
+
+def node_memory(p, nnodes=10000):
+    """Measures the memory used per node of a frontier
+
+    Expands the search tree breadth first, keeping every generated node alive (as a frontier would),
+    and measures the memory allocated for them with tracemalloc
+
+    Parameters
+    ----------
+    p : ASARProblem
+    nnodes : int
+        Number of nodes to generate (less if the search tree is smaller)
+
+    Returns
+    -------
+    nodes : int
+        Number of nodes generated
+    bytes_per_node : float
+    """
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    frontier = [search.Node(p.initial)]
+    i = 0
+    while i < len(frontier) and len(frontier) < nnodes:
+        frontier.extend(frontier[i].expand(p))
+        i += 1
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return len(frontier), (after - before) / len(frontier)
+
+
+def solve(filename, engine='astar', workers=None, **kwargs):
+    """Loads and solves an input file, measuring the wall time and the peak RSS of the process
+
+    Parameters
+    ----------
+    filename : string
+    engine : string
+        Key of solution.ENGINES
+    workers : int
+        Number of worker processes of the hda engine (default is one per core)
+    kwargs : dictionary
+        Arguments given to the ASARProblem constructor
+
+    Returns
+    -------
+    dictionary
+        With keys: file, engine, time (seconds, load and search), expanded (number of expanded nodes, only counted
+        by the astar engine), peak_rss (KiB) and profit (None if infeasible)
+    """
+
+    start = time.perf_counter()
+    p = load_problem(filename, **kwargs)
+    engine_kwargs = {'workers': workers} if engine == 'hda' else {}
+    if engine == 'dfbnb':
+        engine_kwargs['transpositions'] = solution.TRANSPOSITIONS
+    stats = None
+    if engine == 'astar':
+        stats = engine_kwargs['stats'] = search.SearchStats(timers=False)
+    sol = None
+    if p.presolve():
+        sol = solution.ENGINES[engine](p, f=p.evaluation, **engine_kwargs)
+    elapsed = time.perf_counter() - start
+
+    return {'file': filename,
+            'engine': engine,
+            'time': elapsed,
+            'expanded': None if stats is None else stats.expanded,
+            'peak_rss': search.peak_rss(),
+            'profit': None if sol is None else p.calculate_profit(sol.state)}
+
+
+def run_isolated(filename, engine, timeout, workers=None):
+    """Runs solve in a new process, so that its peak RSS is not mixed with other runs (the peak RSS of the workers of
+    the hda engine is not included)
+
+    Returns
+    -------
+    dictionary
+        As returned by solve, with status 'ok'; or only with status 'timeout' if the process timed out, or 'error' and
+        error (the last line it wrote to stderr) if it failed (an input error, killed for running out of memory...)
+    """
+
+    command = [sys.executable, __file__, 'run', filename, '--engine', engine]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                                 timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout'}
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return {'status': 'error', 'error': lines[-1] if lines else "exit code {}".format(process.returncode)}
+    return dict(json.loads(process.stdout.splitlines()[-1]), status='ok')
+
+
+def run(args):
+    """Solves one input file and prints the measurements as JSON"""
+
+    print(json.dumps(solve(args.file, args.engine, args.workers)))
+
+
+def engines(args):
+    """Compares the wall time and peak RSS of the search engines on each input file"""
+
+    header = ['Instance']
+    for engine in args.engines:
+        header += [engine + ' time (s)', engine + ' RSS (MiB)', engine + ' profit']
+
+    table = []
+    for filename in args.files or INSTANCES:
+        row = [filename]
+        for engine in args.engines:
+            result = run_isolated(filename, engine, args.timeout)
+            if result['status'] != 'ok':
+                row += [result['status'], '-', '-']
+            else:
+                row += ['{:.3f}'.format(result['time']), '{:.1f}'.format(result['peak_rss'] / 1024),
+                        'Infeasible' if result['profit'] is None else result['profit']]
+        table.append(row)
+        print_table([row])
+
+    print()
+    print_table(table, header)
+
+
+def scaling(args):
+    """Compares the wall time of the hda engine with each number of workers on synthetic instances"""
+
+    header = ['Instance', 'astar time (s)']
+    for workers in args.workers:
+        header += ['hda {} time (s)'.format(workers), 'speedup']
+
+    table = []
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in args.seeds:
+            name = 'synthetic-{}-{}-{}-{}-{}.txt'.format(args.planes, args.legs_per_plane, args.airports,
+                                                         args.tightness, seed)
+            filename = os.path.join(directory, name)
+            with open(filename, 'w') as f:
+                f.write(generator.generate(args.planes, args.legs_per_plane, args.airports, seed=seed,
+                                           tightness=args.tightness))
+
+            row = [name]
+            result = run_isolated(filename, 'astar', args.timeout)
+            row.append(result['status'] if result['status'] != 'ok' else '{:.3f}'.format(result['time']))
+            base = None
+            for workers in args.workers:
+                result = run_isolated(filename, 'hda', args.timeout, workers)
+                if result['status'] != 'ok':
+                    row += [result['status'], '-']
+                    continue
+                base = base or result['time']    # Speedup relative to the first number of workers
+                row += ['{:.3f}'.format(result['time']), '{:.2f}'.format(base / result['time'])]
+            table.append(row)
+            print_table([row])
+
+    print()
+    print_table(table, header)
+
+
+def git_commit():
+    """Returns the hash of the current git commit (with a + if there are uncommitted changes), or None"""
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout.strip()
+        changes = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], stdout=subprocess.PIPE,
+                                 universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if changes else '')
+
+
+def suite(args):
+    """Solves the bundled and generated instances and saves the measurements in a results file"""
+
+    commit = git_commit()
+    output = args.output or os.path.join('log', 'benchmark-{}.json'.format(commit or 'nogit'))
+    results = {'version': RESULTS_VERSION,
+               'created': datetime.datetime.now().isoformat(timespec='seconds'),
+               'commit': commit,
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'engine': args.engine,
+               'repeat': args.repeat,
+               'instances': []}
+
+    table = []
+    with tempfile.TemporaryDirectory() as directory:
+        instances = [(filename, filename) for filename in args.files or INSTANCES]
+        if not args.files and not args.no_synthetic:
+            for planes, legs_per_plane, airports, seed in SYNTHETIC:
+                name = 'synthetic-{}-{}-{}-{}.txt'.format(planes, legs_per_plane, airports, seed)
+                filename = os.path.join(directory, name)
+                with open(filename, 'w') as f:
+                    f.write(generator.generate(planes, legs_per_plane, airports, seed=seed))
+                instances.append((name, filename))
+
+        for name, filename in instances:
+            runs = []
+            for _ in range(args.repeat):
+                result = run_isolated(filename, args.engine, args.timeout)
+                if result['status'] != 'ok':
+                    break
+                runs.append(result)
+            if len(runs) < args.repeat:
+                # A failed or timed out run is recorded, and the suite goes on with the next instance
+                instance = {'instance': name, 'status': result['status'], 'times': [run['time'] for run in runs]}
+                if result['status'] == 'error':
+                    instance['error'] = result['error']
+                    print(name + ":", result['error'], file=sys.stderr)
+                row = [name, result['status'], '-', '-', '-']
+            else:
+                # The fastest run is the least disturbed by the rest of the system
+                instance = {'instance': name, 'status': 'ok',
+                            'time': min(run['time'] for run in runs),
+                            'times': [run['time'] for run in runs],
+                            'expanded': runs[0]['expanded'],
+                            'peak_rss': max(run['peak_rss'] for run in runs),
+                            'profit': runs[0]['profit']}
+                row = [name, '{:.3f}'.format(instance['time']),
+                       '-' if instance['expanded'] is None else instance['expanded'],
+                       '{:.1f}'.format(instance['peak_rss'] / 1024),
+                       'Infeasible' if instance['profit'] is None else instance['profit']]
+            results['instances'].append(instance)
+            table.append(row)
+            print_table([row])
+
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    print()
+    print_table(table, ['Instance', 'Time (s)', 'Expanded', 'RSS (MiB)', 'Profit'])
+    print()
+    print("Results saved in", output)
+
+
+def compare(args):
+    """Compares two results files and flags the regressions of the second one"""
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    for results in (old, new):
+        if results.get('version') != RESULTS_VERSION:
+            sys.exit("Unsupported results file version {}".format(results.get('version')))
+
+    print("Old: commit {commit}, {created}, engine {engine}, Python {python}".format(**old))
+    print("New: commit {commit}, {created}, engine {engine}, Python {python}".format(**new))
+    print()
+
+    def ratio(new_value, old_value):
+        return new_value / old_value if old_value else inf
+
+    old_instances = {instance['instance']: instance for instance in old['instances']}
+    table = []
+    regressions = 0
+    for instance in new['instances']:
+        name = instance['instance']
+        before = old_instances.get(name)
+        if before is None:
+            continue
+        flags = []
+        if instance['status'] != 'ok' or before['status'] != 'ok':
+            if instance['status'] != before['status']:
+                flags.append('status {} -> {}'.format(before['status'], instance['status']))
+            if instance['status'] != 'ok' and before['status'] == 'ok':
+                regressions += 1
+            table.append([name, before['status'], instance['status'], '-', '-', '-', ', '.join(flags)])
+            continue
+
+        time_ratio = ratio(instance['time'], before['time'])
+        if time_ratio > 1 + args.threshold and instance['time'] - before['time'] > args.min_seconds:
+            flags.append('slower')
+        if instance['expanded'] is not None and before['expanded'] is not None and \
+                instance['expanded'] > before['expanded']:
+            flags.append('more nodes')
+        if ratio(instance['peak_rss'], before['peak_rss']) > 1 + args.threshold:
+            flags.append('more memory')
+        if instance['profit'] != before['profit']:
+            flags.append('PROFIT CHANGED')
+        regressions += bool(flags)
+        table.append([name, '{:.3f}'.format(before['time']), '{:.3f}'.format(instance['time']),
+                      '{:.2f}'.format(time_ratio),
+                      '{} -> {}'.format(before['expanded'], instance['expanded']),
+                      '{:.2f}'.format(ratio(instance['peak_rss'], before['peak_rss'])),
+                      ', '.join(flags)])
+
+    print_table(table, ['Instance', 'Old time (s)', 'New time (s)', 'Time ratio', 'Expanded', 'RSS ratio',
+                        'Regressions'])
+    missing = set(old_instances) - {instance['instance'] for instance in new['instances']}
+    if missing:
+        print()
+        print("Not in the new results:", ", ".join(sorted(missing)))
+    print()
+    print("{} regressions".format(regressions))
+    if regressions:
+        sys.exit(1)
+
+
+def import_times(module):
+    """Imports a module in a new process with python -X importtime
+
+    Parameters
+    ----------
+    module : string
+
+    Returns
+    -------
+    wall_time : float
+        Seconds taken by the process, including the interpreter startup
+    cumulative : dictionary
+        Import time of each module imported, including the modules it imported, in seconds
+    """
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    wall_time = time.perf_counter() - start
+
+    # Lines are "import time: self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            cumulative[fields[2].strip()] = int(fields[1]) / 1e6
+    return wall_time, cumulative
+
+
+def startup(args):
+    """Measures the startup time of a process importing the solver, and the import time of the slowest modules"""
+
+    # Measures the usual case, where the modules are already compiled to bytecode
+    compileall.compile_dir('.', maxlevels=0, force=True, quiet=1)
+
+    interpreter = min(import_times('sys')[0] for _ in range(args.repeat))
+    wall_time = inf
+    cumulative = {}
+    for _ in range(args.repeat):
+        run_time, run_cumulative = import_times(args.module)
+        wall_time = min(wall_time, run_time)
+        for name, seconds in run_cumulative.items():
+            cumulative[name] = min(seconds, cumulative.get(name, inf))
+
+    print("Interpreter startup: {:.1f} ms".format(interpreter * 1000))
+    print("Startup importing {}: {:.1f} ms".format(args.module, wall_time * 1000))
+    print()
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:args.top]
+    print_table([[name, '{:.1f}'.format(seconds * 1000)] for name, seconds in slowest],
+                ['Module', 'Cumulative import time (ms)'])
+
+
+def memory(args):
+    """Prints the memory used per search node for each input file"""
+
+    for filename in args.files:
+        nodes, bytes_per_node = node_memory(load_problem(filename), args.nodes)
+        print("{}: {} nodes, {:.0f} bytes per node".format(filename, nodes, bytes_per_node))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Benchmarks of the ASAR solver")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    parser_memory = subparsers.add_parser('memory', help="memory used per search node")
+    parser_memory.add_argument('files', nargs='+', help="input files")
+    parser_memory.add_argument('--nodes', type=int, default=10000, help="number of nodes to generate")
+    parser_memory.set_defaults(func=memory)
+
+    parser_engines = subparsers.add_parser('engines', help="wall time and peak RSS of the search engines")
+    parser_engines.add_argument('files', nargs='*', help="input files (default is input/ and private_tests/)")
+    parser_engines.add_argument('--engines', nargs='+', choices=sorted(solution.ENGINES), default=['astar', 'idastar'],
+                                help="search engines to compare")
+    parser_engines.add_argument('--timeout', type=float, default=60, help="time limit per run in seconds")
+    parser_engines.set_defaults(func=engines)
+
+    parser_scaling = subparsers.add_parser('scaling', help="wall time of the hda engine with each number of workers")
+    parser_scaling.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8], help="numbers of workers")
+    parser_scaling.add_argument('--planes', type=int, default=3, help="planes of the synthetic instances")
+    parser_scaling.add_argument('--legs-per-plane', type=int, default=4,
+                                help="legs of the round trip of each plane of the synthetic instances")
+    parser_scaling.add_argument('--airports', type=int, default=5, help="airports of the synthetic instances")
+    parser_scaling.add_argument('--tightness', type=float, default=0.0,
+                                help="time-window tightness of the synthetic instances (see generator.generate)")
+    parser_scaling.add_argument('--seeds', nargs='+', type=int, default=[0, 1, 2],
+                                help="seeds of the synthetic instances, one instance per seed")
+    parser_scaling.add_argument('--timeout', type=float, default=600, help="time limit per run in seconds")
+    parser_scaling.set_defaults(func=scaling)
+
+    parser_startup = subparsers.add_parser('startup', help="startup and import times")
+    parser_startup.add_argument('--module', default='solution', help="module to import")
+    parser_startup.add_argument('--repeat', type=int, default=5, help="runs, of which the fastest is reported")
+    parser_startup.add_argument('--top', type=int, default=15, help="number of modules to show")
+    parser_startup.set_defaults(func=startup)
+
+    parser_suite = subparsers.add_parser('suite', help="benchmark suite, saved in a results file")
+    parser_suite.add_argument('files', nargs='*',
+                              help="input files (default is input/, private_tests/ and the generated instances)")
+    parser_suite.add_argument('--engine', choices=sorted(solution.ENGINES), default='astar', help="search engine")
+    parser_suite.add_argument('--repeat', type=int, default=3, help="runs per instance, of which the fastest is kept")
+    parser_suite.add_argument('--timeout', type=float, default=120, help="time limit per run in seconds")
+    parser_suite.add_argument('--no-synthetic', action='store_true', help="skip the generated instances")
+    parser_suite.add_argument('--output', default=None,
+                              help="results file (default is log/benchmark-<commit>.json)")
+    parser_suite.set_defaults(func=suite)
+
+    parser_compare = subparsers.add_parser('compare', help="compare two results files")
+    parser_compare.add_argument('old', help="results file of the baseline")
+    parser_compare.add_argument('new', help="results file to check for regressions")
+    parser_compare.add_argument('--threshold', type=float, default=0.1,
+                                help="relative increase of time or memory that counts as a regression")
+    parser_compare.add_argument('--min-seconds', type=float, default=0.01,
+                                help="time increases smaller than this are ignored as noise")
+    parser_compare.set_defaults(func=compare)
+
+    parser_run = subparsers.add_parser('run', help="solve one input file and print its measurements as JSON")
+    parser_run.add_argument('file', help="input file")
+    parser_run.add_argument('--engine', choices=sorted(solution.ENGINES), default='astar', help="search engine")
+    parser_run.add_argument('--workers', type=int, default=None, help="worker processes of the hda engine")
+    parser_run.set_defaults(func=run)
+
+    args = parser.parse_args(args)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    from sys import argv
+    main(argv[1:])
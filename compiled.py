@@ -0,0 +1,194 @@
+#!env/bin/python3.7
+
+"""Compiled ASAR input files
+
+A compiled file holds the same input as a text file (airports, classes, airplanes and legs) in a binary format that
+solution.read_compiled_file memory-maps instead of parsing it line by line. Names are replaced by integer ids and times
+are stored in minutes. All numbers are little-endian:
+
+    header     magic b'ASAR', version (uint16), 2 reserved bytes, then (uint32) the number of airports, classes,
+               airplanes and legs and the size of the names section
+    names      UTF-8 names of the airports, classes and airplanes, in this order, each one followed by a zero byte
+    airports   opening and closing time of each airport (int32)
+    classes    rotation time of each class (int32), or -1 if the class has none (it is only named by airplanes or legs)
+    airplanes  class id of each airplane (int32)
+    legs       departure airport id, arrival airport id and duration of each leg (int32)
+    profits    profit of each leg for each class (float64, a row per leg), or NaN if the leg has no profit for it
+
+The names and legs sections are padded with zero bytes to a multiple of 8 bytes.
+
+Usage:
+    python3 compiled.py compile <input files> [--output-dir directory]
+        Compiles text input files (to <name>.asarb, next to each input file by default)
+    python3 compiled.py decompile <compiled file>
+        Prints a compiled file in the text format
+    python3 compiled.py verify [<input files>]
+        Checks that compiling each text input file (default is input/ and private_tests/) and loading it gives back
+        the same input, and that so does decompiling it
+"""
+
+import argparse
+import array
+import glob
+import io
+import os.path
+import sys
+import tempfile
+
+from solution import (COMPILED_EXTENSION, COMPILED_HEADER, COMPILED_MAGIC, COMPILED_VERSION, NO_ROTATION,
+                      minutes2hhmm, read_compiled_file, read_input_from_file)
+
+
+def padding(size):
+    """Returns the zero bytes that pad a section of the given size to a multiple of 8 bytes"""
+    return bytes(-size % 8)
+
+
+def little_endian(numbers):
+    """Returns the bytes of an array, in little-endian byte order"""
+    if sys.byteorder != 'little':
+        numbers = array.array(numbers.typecode, numbers)
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def compile_input(A, C, P, L):
+    """Compiles the input of a problem
+
+    Parameters
+    ----------
+    A, C, P, L
+        As returned by solution.read_input_from_file
+
+    Returns
+    -------
+    bytes
+        The compiled file
+    """
+
+    airport_ids = {airport: i for i, airport in enumerate(A)}
+    # Classes with a rotation time come first, in the same order as in C
+    class_ids = {plane_class: i for i, plane_class in enumerate(C)}
+    for plane_class in [plane['class'] for plane in P] + [key for leg in L for key in leg if key not in
+                                                          ('id', 'dep', 'arr', 'dl', 'maxprofit')]:
+        class_ids.setdefault(plane_class, len(class_ids))
+
+    names = b''.join(name.encode('utf-8') + b'\0'
+                     for name in list(airport_ids) + list(class_ids) + [plane['airplane'] for plane in P])
+
+    airports = array.array('i', [time for airport in A.values() for time in (airport['start'], airport['end'])])
+    classes = array.array('i', [C.get(plane_class, NO_ROTATION) for plane_class in class_ids])
+    planes = array.array('i', [class_ids[plane['class']] for plane in P])
+    legs = array.array('i', [n for leg in L for n in (airport_ids[leg['dep']], airport_ids[leg['arr']], leg['dl'])])
+    profits = array.array('d', [leg.get(plane_class, float('nan')) for leg in L for plane_class in class_ids])
+
+    header = COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, len(A), len(class_ids), len(P), len(L),
+                                  len(names))
+    sections = [header, names, padding(len(names)), little_endian(airports), little_endian(classes),
+                little_endian(planes), little_endian(legs)]
+    size = sum(len(section) for section in sections)
+    sections += [padding(size), little_endian(profits)]
+    return b''.join(sections)
+
+
+def decompile(A, C, P, L):
+    """Writes the input of a problem in the text format
+
+    Parameters
+    ----------
+    A, C, P, L
+        As returned by solution.read_input_from_file
+
+    Returns
+    -------
+    string
+    """
+
+    def profit(value):
+        return str(int(value)) if value.is_integer() else repr(value)
+
+    lines = ["A {} {} {}".format(name, minutes2hhmm(a['start']), minutes2hhmm(a['end'])) for name, a in A.items()]
+    lines.append("")
+    lines += ["P {} {}".format(plane['airplane'], plane['class']) for plane in P]
+    lines.append("")
+    for leg in L:
+        profits = " ".join("{} {}".format(key, profit(value)) for key, value in leg.items()
+                           if key not in ('id', 'dep', 'arr', 'dl', 'maxprofit'))
+        lines.append("L {} {} {} {}".format(leg['dep'], leg['arr'], minutes2hhmm(leg['dl']), profits))
+    lines.append("")
+    lines += ["C {} {}".format(name, minutes2hhmm(rotation)) for name, rotation in C.items()]
+    return "\n".join(lines) + "\n"
+
+
+def compiled_filename(in_filename, output_dir=None):
+    """Returns the name of the compiled file of a text input file"""
+    name = os.path.splitext(os.path.basename(in_filename))[0] + COMPILED_EXTENSION
+    return os.path.join(output_dir or os.path.dirname(in_filename), name)
+
+
+def compile_files(args):
+    """Compiles text input files"""
+
+    for in_filename in args.files:
+        with open(in_filename, 'r') as f:
+            data = compile_input(*read_input_from_file(f))
+        out_filename = compiled_filename(in_filename, args.output_dir)
+        with open(out_filename, 'wb') as f:
+            f.write(data)
+        print("{} -> {} ({} bytes)".format(in_filename, out_filename, len(data)))
+
+
+def decompile_file(args):
+    """Prints a compiled file in the text format"""
+
+    print(decompile(*read_compiled_file(args.file)), end='')
+
+
+def verify(args):
+    """Checks that compiling and loading, and decompiling, give back the input of each text input file"""
+
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for in_filename in args.files or sorted(glob.glob('input/*.txt')) + sorted(glob.glob('private_tests/*.txt')):
+            with open(in_filename, 'r') as f:
+                text_input = read_input_from_file(f)
+            out_filename = compiled_filename(in_filename, directory)
+            with open(out_filename, 'wb') as f:
+                f.write(compile_input(*text_input))
+
+            compiled_input = read_compiled_file(out_filename)
+            decompiled_input = read_input_from_file(io.StringIO(decompile(*compiled_input)))
+            ok = compiled_input == text_input and decompiled_input == text_input
+            failed += not ok
+            print("{}: {}".format(in_filename, "OK" if ok else "FAILED"))
+
+    if failed:
+        sys.exit("{} files failed".format(failed))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Compiled ASAR input files")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    parser_compile = subparsers.add_parser('compile', help="compile text input files")
+    parser_compile.add_argument('files', nargs='+', help="text input files")
+    parser_compile.add_argument('--output-dir', default=None,
+                                help="directory of the compiled files (default is the directory of each input file)")
+    parser_compile.set_defaults(func=compile_files)
+
+    parser_decompile = subparsers.add_parser('decompile', help="print a compiled file in the text format")
+    parser_decompile.add_argument('file', help="compiled file")
+    parser_decompile.set_defaults(func=decompile_file)
+
+    parser_verify = subparsers.add_parser('verify', help="check that compiling gives back the same input")
+    parser_verify.add_argument('files', nargs='*', help="text input files (default is input/ and private_tests/)")
+    parser_verify.set_defaults(func=verify)
+
+    args = parser.parse_args(args)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    from sys import argv
+    main(argv[1:])
@@ -0,0 +1,219 @@
+#!env/bin/python3.7
+
+"""Synthetic ASAR instances
+
+Each plane of the fleet gets a random round trip from a random airport and a planned timetable for it, so every
+instance has at least one feasible schedule, where each plane flies its own round trip. The opening hours of the
+airports are 0600-2300, narrowed towards the times at which the planned timetables use them as the tightness grows.
+Every leg has to be flown, so the number of legs is the total length of the round trips.
+
+Usage:
+    python3 generator.py [--planes 4 | --fleet n [n ...]] [--legs-per-plane 4 | --legs-per-plane min max]
+                         [--airports 6] [--classes 2] [--tightness 0] [--seed 0] [--output file] [--check]
+        Writes an instance (to stdout by default). With --check, also checks that the planned schedule is feasible
+        for ASARProblem
+"""
+
+import argparse
+import io
+import sys
+import random
+
+from solution import ASARProblem, minutes2hhmm
+
+# Opening hours of the airports when the tightness is 0
+OPENING = 6 * 60
+CLOSING = 23 * 60
+
+
+def generate(planes=4, legs_per_plane=4, airports=6, classes=2, seed=0, fleet=None, tightness=0.0):
+    """Generates a random instance
+
+    Parameters
+    ----------
+    planes : int
+        Number of planes in the fleet, of random classes (ignored if fleet is given)
+    legs_per_plane : int or tuple
+        Number of legs of the round trip of each plane, or (min, max) to draw it for each plane, from 2 to 11 (the
+        longer the round trips, the shorter the legs, so that they fit in a day)
+    airports : int
+        Number of airports (at least 3)
+    classes : int
+        Number of plane classes (ignored if fleet is given)
+    seed : int
+        Seed of the random number generator. The same arguments always give the same instance
+    fleet : list of ints, optional
+        Number of planes of each class
+    tightness : float
+        From 0 (every airport is open from 0600 to 2300) to 1 (every airport is only open around the times at which
+        the planned schedule uses it)
+
+    Returns
+    -------
+    string
+        The instance, in the input file format
+    """
+    return generate_with_schedule(planes, legs_per_plane, airports, classes, seed, fleet, tightness)[0]
+
+
+def generate_with_schedule(planes=4, legs_per_plane=4, airports=6, classes=2, seed=0, fleet=None, tightness=0.0):
+    """Generates a random instance and its planned schedule
+
+    Parameters
+    ----------
+    See generate
+
+    Returns
+    -------
+    string
+        The instance, in the input file format
+    list of lists
+        For each plane (in the order of the instance), the ids of the legs of its round trip, in flying order
+    """
+
+    min_legs, max_legs = (legs_per_plane, legs_per_plane) if isinstance(legs_per_plane, int) else legs_per_plane
+    # Longest leg such that a round trip fits in the 0600-2300 windows with the longest turnaround (60 minutes)
+    max_duration = min(120, (CLOSING - OPENING) // max_legs - 60)
+    if min_legs < 2 or min_legs > max_legs or max_duration < 30:
+        raise ValueError("legs_per_plane must be between 2 and 11")
+    if fleet is None and (planes < 1 or classes < 1):
+        raise ValueError("planes and classes must be at least 1")
+    if fleet is not None and (min(fleet) < 0 or sum(fleet) < 1):
+        raise ValueError("the fleet must have at least one plane, and no class a negative number of them")
+    if airports < 3:
+        raise ValueError("airports must be at least 3")
+    if not 0 <= tightness <= 1:
+        raise ValueError("tightness must be between 0 and 1")
+
+    rng = random.Random(seed)
+    airport_names = ["A{:03d}".format(i) for i in range(airports)]
+    class_names = ["c{}".format(i) for i in range(classes if fleet is None else len(fleet))]
+    turnarounds = {c: rng.randrange(20, 61, 5) for c in class_names}
+    if fleet is None:
+        plane_classes = [rng.choice(class_names) for _ in range(planes)]
+    else:
+        plane_classes = [c for c, n in zip(class_names, fleet) for _ in range(n)]
+
+    lines = []
+    legs = []       # (line, index of the plane, position in its round trip)
+    usage = {}      # Airport: earliest and latest planned time at which it is used
+    for i, plane_class in enumerate(plane_classes):
+        lines.append("P P{:03d} {}".format(i, plane_class))
+
+        # Round trip visiting random airports, never flying to the airport it is at
+        route = [rng.choice(airport_names)]
+        for _ in range(rng.randint(min_legs, max_legs) - 1):
+            route.append(rng.choice([a for a in airport_names if a != route[-1]]))
+        if route[-1] == route[0]:
+            route[-1] = rng.choice([a for a in airport_names if a not in (route[0], route[-2])])
+        route.append(route[0])
+
+        durations = [rng.randrange(30, max_duration + 1, 5) for _ in route[1:]]
+        # Planned timetable: the plane departs at a random time and then as soon as it is ready at each airport
+        slack = CLOSING - OPENING - sum(durations) - turnarounds[plane_class] * (len(durations) - 1)
+        tod = OPENING + rng.randrange(0, slack, 5)
+        usage.setdefault(route[0], []).append(tod)
+        for position, (dep, arr, duration) in enumerate(zip(route, route[1:], durations)):
+            tod += duration
+            usage.setdefault(arr, []).append(tod)
+            tod += turnarounds[plane_class]
+            if position < len(durations) - 1:
+                usage[arr].append(tod)
+            profits = " ".join("{} {}".format(c, rng.randrange(50, 151)) for c in class_names)
+            legs.append(("L {} {} {} {}".format(dep, arr, minutes2hhmm(duration), profits), i, position))
+    lines.append("")
+
+    rng.shuffle(legs)
+    lines += [line for line, _, _ in legs]
+    lines.append("")
+
+    lines += ["C {} {}".format(c, minutes2hhmm(turnarounds[c])) for c in class_names]
+
+    # Each airport opens by its earliest planned use and closes after its latest one (rounded to 5 minutes), so that
+    # the planned timetables stay feasible
+    airport_lines = []
+    for a in airport_names:
+        start, end = OPENING, CLOSING
+        if a in usage:
+            start += int(tightness * (min(usage[a]) - OPENING)) // 5 * 5
+            end -= int(tightness * (CLOSING - 1 - max(usage[a]))) // 5 * 5
+        airport_lines.append("A {} {} {}".format(a, minutes2hhmm(start), minutes2hhmm(end)))
+    lines = airport_lines + [""] + lines
+
+    schedule = [[] for _ in plane_classes]
+    for leg_id, (_, i, position) in sorted(enumerate(legs), key=lambda leg: leg[1][2]):
+        schedule[i].append(leg_id)
+
+    return "\n".join(lines) + "\n", schedule
+
+
+def check_schedule(instance, schedule):
+    """Checks that a schedule is a feasible solution of an instance, by adding its legs through the actions of
+    ASARProblem
+
+    Parameters
+    ----------
+    instance : string
+        The instance, in the input file format
+    schedule : list of lists
+        For each plane, the ids of its legs, in flying order
+
+    Returns
+    -------
+    bool
+        True if the schedule is feasible
+    """
+
+    p = ASARProblem(symmetry=False)
+    p.load(io.StringIO(instance))
+    s = p.initial
+    for i, leg_ids in enumerate(schedule):
+        for leg_id in leg_ids:
+            action = next((a for a in p.actions(s) if a[:2] == (i, leg_id)), None)
+            if action is None:
+                return False
+            s = p.result(s, action)
+    return p.goal_test(s)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Synthetic ASAR instances")
+    parser.add_argument('--planes', type=int, default=4, help="number of planes, of random classes")
+    parser.add_argument('--fleet', type=int, nargs='+', default=None,
+                        help="number of planes of each class (instead of --planes and --classes)")
+    parser.add_argument('--legs-per-plane', type=int, nargs='+', default=[4], metavar='N',
+                        help="length of the round trip of each plane, or its minimum and maximum")
+    parser.add_argument('--airports', type=int, default=6, help="number of airports")
+    parser.add_argument('--classes', type=int, default=2, help="number of plane classes")
+    parser.add_argument('--tightness', type=float, default=0.0,
+                        help="from 0 (airports open 0600-2300) to 1 (only open around the planned schedule)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random number generator")
+    parser.add_argument('--output', default=None, help="output file (default is stdout)")
+    parser.add_argument('--check', action='store_true', help="check that the planned schedule is feasible")
+    args = parser.parse_args(args)
+    if len(args.legs_per_plane) > 2:
+        parser.error("--legs-per-plane takes one or two values")
+
+    try:
+        instance, schedule = generate_with_schedule(args.planes, tuple(args.legs_per_plane * 2)[:2], args.airports,
+                                                    args.classes, args.seed, args.fleet, args.tightness)
+    except ValueError as e:
+        parser.error(e)
+
+    if args.output is None:
+        sys.stdout.write(instance)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(instance)
+
+    if args.check:
+        feasible = check_schedule(instance, schedule)
+        print("{} legs, planned schedule {}".format(sum(map(len, schedule)), "feasible" if feasible else "INFEASIBLE"),
+              file=sys.stderr)
+        if not feasible:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    from sys import argv
+    main(argv[1:])
@@ -4,16 +4,24 @@ Search (Chapters 3-4)
 The way to use this code is to subclass Problem to create a class of problems,
 then create problem instances and solve them with calls to the various search
 functions.
+
+This module only holds what the ASAR solver needs, so that it is quick to
+import. The rest of the AIMA search code (local and online search, genetic
+algorithms, the example problems and graphs...) is in search_aima, which is
+imported the first time one of its names is looked up here.
 """
 
-import bisect
-import math
-import random
+import os
 import sys
+import time
 from collections import deque
 
-from utils import (is_in, argmin, argmax, argmax_random_tie, probability, weighted_sampler, memoize,
-                   print_table, open_data, PriorityQueue, name, distance, vector_add, inf)
+try:
+    import resource
+except ImportError:  # Not available on Windows, where max_rss limits are ignored
+    resource = None
+
+from utils import is_in, memoize, IndexedPriorityQueue, inf
 
 
 class Problem:
@@ -77,7 +85,10 @@ class Node:
     the total path_cost (also known as g) to reach the node. Other functions
     may add an f and h value; see best_first_graph_search and astar_search for
     an explanation of how the f and h values are handled. You will not need to
-    subclass this class."""
+    subclass this class. The attributes are fixed (__slots__), so nodes don't
+    carry an instance dictionary; f and h are left unset until computed."""
+
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth', 'f', 'h')
 
     def __init__(self, state, parent=None, action=None, path_cost=0):
         """Create a search tree Node, derived from a parent by an action."""
@@ -130,47 +141,6 @@ class Node:
         return hash(self.state)
 
 
-# ______________________________________________________________________________
-
-
-class SimpleProblemSolvingAgentProgram:
-    """
-    [Figure 3.1]
-    Abstract framework for a problem-solving agent.
-    """
-
-    def __init__(self, initial_state=None):
-        """State is an abstract representation of the state
-        of the world, and seq is the list of actions required
-        to get to a particular state from the initial state(root)."""
-        self.state = initial_state
-        self.seq = []
-
-    def __call__(self, percept):
-        """[Figure 3.1] Formulate a goal and problem, then
-        search for a sequence of actions to solve it."""
-        self.state = self.update_state(self.state, percept)
-        if not self.seq:
-            goal = self.formulate_goal(self.state)
-            problem = self.formulate_problem(self.state, goal)
-            self.seq = self.search(problem)
-            if not self.seq:
-                return None
-        return self.seq.pop(0)
-
-    def update_state(self, state, percept):
-        raise NotImplementedError
-
-    def formulate_goal(self, state):
-        raise NotImplementedError
-
-    def formulate_problem(self, state, goal):
-        raise NotImplementedError
-
-    def search(self, problem):
-        raise NotImplementedError
-
-
 # ______________________________________________________________________________
 # Uninformed Search algorithms
 
@@ -257,33 +227,298 @@ def breadth_first_graph_search(problem):
     return None
 
 
-def best_first_graph_search(problem, f, display=False):
+def peak_rss():
+    """Return the peak resident memory of this process, in KiB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux, but in bytes on macOS
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def current_rss():
+    """Return the current resident memory of this process, in KiB, or None
+    where it cannot be read (only /proc/self/statm is supported)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+class SearchLimits:
+    """Limits on the resources a search may use: wall-clock seconds, number of
+    expanded nodes, size of the frontier and resident memory (in MiB).
+    None means no limit. The memory limit applies to the current resident
+    memory where it can be read (Linux); elsewhere, to how much the peak
+    resident memory grew since the search started, so that the peak of an
+    earlier search in the same process does not count. The frontier and
+    expansion limits are checked on every expansion; time and memory, which
+    need system calls, only every check_every expansions."""
+
+    def __init__(self, max_seconds=None, max_expanded=None, max_frontier=None, max_rss=None, check_every=100):
+        self.max_seconds = max_seconds
+        self.max_expanded = max_expanded
+        self.max_frontier = max_frontier
+        self.max_rss = max_rss
+        self.check_every = check_every
+        self.start_time = None
+        self.start_peak_rss = 0
+
+    def start(self):
+        """Start counting the time and the growth of the peak memory."""
+        self.start_time = time.time()
+        if self.max_rss is not None and resource is not None:
+            self.start_peak_rss = peak_rss()
+
+    def exceeded(self, expanded, frontier_size):
+        """Return the reason why a limit was reached, or None if none was."""
+        if self.max_expanded is not None and expanded >= self.max_expanded:
+            return 'max_expanded'
+        if self.max_frontier is not None and frontier_size > self.max_frontier:
+            return 'max_frontier'
+        if expanded % self.check_every == 0:
+            if self.max_seconds is not None and time.time() - self.start_time > self.max_seconds:
+                return 'max_seconds'
+            if self.max_rss is not None:
+                rss = current_rss()
+                if rss is None and resource is not None:
+                    rss = peak_rss() - self.start_peak_rss
+                if rss is not None and rss / 1024 > self.max_rss:
+                    return 'max_rss'
+        return None
+
+
+class SearchResult:
+    """The outcome of a search run with SearchLimits. The status is one of:
+    OPTIMAL: node is a goal (optimal for A* with a consistent heuristic);
+    INFEASIBLE: the whole search space was explored without finding a goal;
+    LIMIT: reason names the limit that was reached, and node is the best
+    partial solution found (the deepest expanded node, with the lowest f).
+    expanded and frontier are the number of expanded nodes and the size of
+    the frontier at the end."""
+
+    OPTIMAL = 'optimal'
+    INFEASIBLE = 'infeasible'
+    LIMIT = 'limit'
+
+    def __init__(self, status, node=None, reason=None, expanded=0, frontier=0):
+        self.status = status
+        self.node = node
+        self.reason = reason
+        self.expanded = expanded
+        self.frontier = frontier
+
+    def __repr__(self):
+        return "<SearchResult {} {}>".format(self.status, self.reason or self.node)
+
+
+class SearchStats:
+    """Statistics of a best-first graph search, filled in when given to
+    best_first_graph_search or astar_search: the number of expanded nodes,
+    of generated ones (children), of duplicates (children whose state was
+    already explored or in the frontier with a lower or equal f), of pruned
+    ones (children with f = inf), the peak size of the frontier, the depth
+    of the goal found, the wall time and the time spent in the calls to the
+    problem (actions, result, path_cost, goal_test), to f (evaluation) and
+    in the operations on the frontier (queue). Timing each call slows the
+    search down; pass timers=False to only count.
+    If callback is given, callback(stats) is called every interval seconds
+    during the search (checked every 1000 expansions), with the counters
+    updated so far, e.g. to report progress or sample the frontier."""
+
+    TIMERS = ('actions', 'result', 'path_cost', 'goal_test', 'evaluation', 'queue')
+
+    def __init__(self, timers=True, callback=None, interval=1.0):
+        self.timers = timers
+        self.callback = callback
+        self.interval = interval
+        self.expanded = self.generated = self.duplicates = self.pruned = self.frontier_peak = 0
+        self.depth = None
+        self.time = 0.0
+        self.times = dict.fromkeys(self.TIMERS, 0.0)
+        self.start_time = self.last_sample = None
+
+    def start(self):
+        """Start counting the time."""
+        self.start_time = self.last_sample = time.perf_counter()
+
+    def sample(self):
+        """Call the callback if interval seconds have passed since the last call."""
+        now = time.perf_counter()
+        self.time = now - self.start_time
+        if self.callback is not None and now - self.last_sample >= self.interval:
+            self.last_sample = now
+            self.callback(self)
+
+    def finish(self, goal):
+        """Stop counting the time, and record the depth of the goal (a node or None)."""
+        self.time = time.perf_counter() - self.start_time
+        self.depth = None if goal is None else goal.depth
+
+    def timed(self, name, function):
+        """Return function, adding the time spent in each call to times[name]."""
+        times = self.times
+        clock = time.perf_counter
+
+        def timed_function(*args):
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                times[name] += clock() - start
+        return timed_function
+
+    def effective_branching_factor(self):
+        """The branching factor b* that a uniform tree of the depth of the goal
+        would need to have as many nodes as were generated (plus the root):
+        N + 1 = 1 + b* + b*^2 + ... + b*^d. None if no goal was found."""
+        if not self.depth or not self.generated:
+            return None
+        n = self.generated + 1
+
+        def nodes(b):
+            # Stops adding once there are n nodes, so that b ** i cannot overflow on deep goals
+            total, term = 0, 1.0
+            for _ in range(self.depth + 1):
+                total += term
+                if total >= n:
+                    break
+                term *= b
+            return total
+
+        # b*^d <= N, so b* <= N^(1/d)
+        low, high = 1.0, n ** (1 / self.depth) + 1
+        for _ in range(100):
+            b = (low + high) / 2
+            if nodes(b) < n:
+                low = b
+            else:
+                high = b
+        return (low + high) / 2
+
+    def as_dict(self):
+        """The statistics as a dictionary (which can be dumped as JSON)."""
+        return {'expanded': self.expanded, 'generated': self.generated, 'duplicates': self.duplicates,
+                'pruned': self.pruned, 'frontier_peak': self.frontier_peak, 'depth': self.depth,
+                'effective_branching_factor': self.effective_branching_factor(), 'time': self.time,
+                'times': dict(self.times) if self.timers else None}
+
+
+class TimedProblem(Problem):
+    """Delegates to a problem, adding the time spent in each method to the
+    times of a SearchStats. actions is consumed at once, so that the time of
+    a generator of actions is counted in full."""
+
+    def __init__(self, problem, stats):
+        self.problem = problem
+        self.actions = stats.timed('actions', lambda state: list(problem.actions(state)))
+        self.result = stats.timed('result', problem.result)
+        self.path_cost = stats.timed('path_cost', problem.path_cost)
+        self.goal_test = stats.timed('goal_test', problem.goal_test)
+
+    def __getattr__(self, attr):
+        return getattr(self.problem, attr)
+
+
+class TimedQueue:
+    """Delegates to a priority queue, adding the time spent in each operation
+    to times['queue'] of a SearchStats."""
+
+    def __init__(self, queue, stats):
+        self.queue = queue
+        self.append = stats.timed('queue', queue.append)
+        self.pop = stats.timed('queue', queue.pop)
+        self.contains = stats.timed('queue', queue.__contains__)
+        self.getitem = stats.timed('queue', queue.__getitem__)
+        self.delitem = stats.timed('queue', queue.__delitem__)
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __contains__(self, key):
+        return self.contains(key)
+
+    def __getitem__(self, key):
+        return self.getitem(key)
+
+    def __delitem__(self, key):
+        self.delitem(key)
+
+
+def best_first_graph_search(problem, f, display=False, cache=True, limits=None, stats=None):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
-    f = memoize(f, 'f')
+    a best first search you can examine the f values of the path returned.
+    If f is cheap (e.g. it reads a value already stored in the state), pass
+    cache=False to call it directly instead.
+    If limits (a SearchLimits) is given, the search stops when one of them is
+    reached, and a SearchResult is returned instead of a node or None.
+    If stats (a SearchStats) is given, it is filled in with the statistics of
+    the search."""
+    if cache:
+        f = memoize(f, 'f')
     node = Node(problem.initial)
-    frontier = PriorityQueue('min', f)
+    frontier = IndexedPriorityQueue('min', f)
     frontier.append(node)
     explored = set()
+    generated = duplicates = pruned = peak = 0
+    if limits is not None:
+        limits.start()
+        deepest = node
+    if stats is not None:
+        stats.start()
+        if stats.timers:
+            problem = TimedProblem(problem, stats)
+            f = stats.timed('evaluation', f)
+            frontier = TimedQueue(frontier, stats)
+
+    def finish(goal):
+        if stats is not None:
+            stats.expanded, stats.generated, stats.duplicates, stats.pruned = len(explored), generated, duplicates, pruned
+            stats.frontier_peak = max(peak, len(frontier))
+            stats.finish(goal)
+
     while frontier:
+        if limits is not None:
+            reason = limits.exceeded(len(explored), len(frontier))
+            if reason is not None:
+                finish(None)
+                return SearchResult(SearchResult.LIMIT, deepest, reason, len(explored), len(frontier))
+        if stats is not None and len(explored) % 1000 == 0:
+            finish(None)
+            stats.sample()
+        peak = max(peak, len(frontier))
         node = frontier.pop()
         if problem.goal_test(node.state):
             if display:
                 print(len(explored), "paths have been expanded and", len(frontier), "paths remain in the frontier")
+            finish(node)
+            if limits is not None:
+                return SearchResult(SearchResult.OPTIMAL, node, None, len(explored), len(frontier))
             return node
+        if limits is not None and node.depth > deepest.depth:
+            deepest = node    # Nodes are popped in f order, so the first one at each depth has the lowest f
         explored.add(node.state)
-        for child in node.expand(problem):
+        children = node.expand(problem)
+        generated += len(children)
+        for child in children:
+            if f(child) == inf:    # No goal can be reached from child
+                pruned += 1
+                continue
             if child.state not in explored and child not in frontier:
                 frontier.append(child)
-            elif child in frontier:
-                if f(child) < frontier[child]:
-                    del frontier[child]
-                    frontier.append(child)
+            elif child in frontier and f(child) < frontier[child]:
+                del frontier[child]
+                frontier.append(child)
+            else:
+                duplicates += 1
+    finish(None)
+    if limits is not None:
+        return SearchResult(SearchResult.INFEASIBLE, None, None, len(explored), 0)
     return None
 
 
@@ -408,1106 +643,413 @@ greedy_best_first_graph_search = best_first_graph_search
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
 
 
-def astar_search(problem, h=None, display=False):
+def astar_search(problem, h=None, display=False, f=None, limits=None, stats=None):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
-    else in your Problem subclass."""
-    h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display)
-
-
-# ______________________________________________________________________________
-# A* heuristics 
-
-class EightPuzzle(Problem):
-    """ The problem of sliding tiles numbered from 1 to 8 on a 3x3 board, where one of the
-    squares is a blank. A state is represented as a tuple of length 9, where  element at
-    index i represents the tile number  at index i (0 if it's an empty square) """
-
-    def __init__(self, initial, goal=(1, 2, 3, 4, 5, 6, 7, 8, 0)):
-        """ Define goal state and initialize a problem """
-        super().__init__(initial, goal)
-
-    def find_blank_square(self, state):
-        """Return the index of the blank square in a given state"""
-
-        return state.index(0)
-
-    def actions(self, state):
-        """ Return the actions that can be executed in the given state.
-        The result would be a list, since there are only four possible actions
-        in any given state of the environment """
-
-        possible_actions = ['UP', 'DOWN', 'LEFT', 'RIGHT']
-        index_blank_square = self.find_blank_square(state)
-
-        if index_blank_square % 3 == 0:
-            possible_actions.remove('LEFT')
-        if index_blank_square < 3:
-            possible_actions.remove('UP')
-        if index_blank_square % 3 == 2:
-            possible_actions.remove('RIGHT')
-        if index_blank_square > 5:
-            possible_actions.remove('DOWN')
-
-        return possible_actions
-
-    def result(self, state, action):
-        """ Given state and action, return a new state that is the result of the action.
-        Action is assumed to be a valid action in the state """
-
-        # blank is the index of the blank square
-        blank = self.find_blank_square(state)
-        new_state = list(state)
-
-        delta = {'UP': -3, 'DOWN': 3, 'LEFT': -1, 'RIGHT': 1}
-        neighbor = blank + delta[action]
-        new_state[blank], new_state[neighbor] = new_state[neighbor], new_state[blank]
-
-        return tuple(new_state)
-
-    def goal_test(self, state):
-        """ Given a state, return True if state is a goal state or False, otherwise """
-
-        return state == self.goal
-
-    def check_solvability(self, state):
-        """ Checks if the given state is solvable """
-
-        inversion = 0
-        for i in range(len(state)):
-            for j in range(i + 1, len(state)):
-                if (state[i] > state[j]) and state[i] != 0 and state[j] != 0:
-                    inversion += 1
-
-        return inversion % 2 == 0
-
-    def h(self, node):
-        """ Return the heuristic value for a given state. Default heuristic function used is 
-        h(n) = number of misplaced tiles """
-
-        return sum(s != g for (s, g) in zip(node.state, self.goal))
-
-
-# ______________________________________________________________________________
-
-
-class PlanRoute(Problem):
-    """ The problem of moving the Hybrid Wumpus Agent from one place to other """
-
-    def __init__(self, initial, goal, allowed, dimrow):
-        """ Define goal state and initialize a problem """
-        super().__init__(initial, goal)
-        self.dimrow = dimrow
-        self.goal = goal
-        self.allowed = allowed
-
-    def actions(self, state):
-        """ Return the actions that can be executed in the given state.
-        The result would be a list, since there are only three possible actions
-        in any given state of the environment """
-
-        possible_actions = ['Forward', 'TurnLeft', 'TurnRight']
-        x, y = state.get_location()
-        orientation = state.get_orientation()
-
-        # Prevent Bumps
-        if x == 1 and orientation == 'LEFT':
-            if 'Forward' in possible_actions:
-                possible_actions.remove('Forward')
-        if y == 1 and orientation == 'DOWN':
-            if 'Forward' in possible_actions:
-                possible_actions.remove('Forward')
-        if x == self.dimrow and orientation == 'RIGHT':
-            if 'Forward' in possible_actions:
-                possible_actions.remove('Forward')
-        if y == self.dimrow and orientation == 'UP':
-            if 'Forward' in possible_actions:
-                possible_actions.remove('Forward')
-
-        return possible_actions
-
-    def result(self, state, action):
-        """ Given state and action, return a new state that is the result of the action.
-        Action is assumed to be a valid action in the state """
-        x, y = state.get_location()
-        proposed_loc = list()
-
-        # Move Forward
-        if action == 'Forward':
-            if state.get_orientation() == 'UP':
-                proposed_loc = [x, y + 1]
-            elif state.get_orientation() == 'DOWN':
-                proposed_loc = [x, y - 1]
-            elif state.get_orientation() == 'LEFT':
-                proposed_loc = [x - 1, y]
-            elif state.get_orientation() == 'RIGHT':
-                proposed_loc = [x + 1, y]
-            else:
-                raise Exception('InvalidOrientation')
-
-        # Rotate counter-clockwise
-        elif action == 'TurnLeft':
-            if state.get_orientation() == 'UP':
-                state.set_orientation('LEFT')
-            elif state.get_orientation() == 'DOWN':
-                state.set_orientation('RIGHT')
-            elif state.get_orientation() == 'LEFT':
-                state.set_orientation('DOWN')
-            elif state.get_orientation() == 'RIGHT':
-                state.set_orientation('UP')
-            else:
-                raise Exception('InvalidOrientation')
-
-        # Rotate clockwise
-        elif action == 'TurnRight':
-            if state.get_orientation() == 'UP':
-                state.set_orientation('RIGHT')
-            elif state.get_orientation() == 'DOWN':
-                state.set_orientation('LEFT')
-            elif state.get_orientation() == 'LEFT':
-                state.set_orientation('UP')
-            elif state.get_orientation() == 'RIGHT':
-                state.set_orientation('DOWN')
-            else:
-                raise Exception('InvalidOrientation')
-
-        if proposed_loc in self.allowed:
-            state.set_location(proposed_loc[0], [proposed_loc[1]])
-
-        return state
-
-    def goal_test(self, state):
-        """ Given a state, return True if state is a goal state or False, otherwise """
-
-        return state.get_location() == tuple(self.goal)
-
-    def h(self, node):
-        """ Return the heuristic value for a given state."""
-
-        # Manhattan Heuristic Function
-        x1, y1 = node.state.get_location()
-        x2, y2 = self.goal
-
-        return abs(x2 - x1) + abs(y2 - y1)
-
-
-# ______________________________________________________________________________
-# Other search algorithms
-
-
-def recursive_best_first_search(problem, h=None):
-    """[Figure 3.26]"""
+    else in your Problem subclass. If the problem already computes f(n)
+    when it creates each state, pass that function as f instead: it is
+    then used as is, without the memoize wrappers.
+    If limits (a SearchLimits) is given, a SearchResult is returned; if
+    stats (a SearchStats) is given, it is filled in; see
+    best_first_graph_search."""
+    if f is not None:
+        return best_first_graph_search(problem, f, display, cache=False, limits=limits, stats=stats)
     h = memoize(h or problem.h, 'h')
-
-    def RBFS(problem, node, flimit):
-        if problem.goal_test(node.state):
-            return node, 0  # (The second value is immaterial)
-        successors = node.expand(problem)
-        if len(successors) == 0:
-            return None, inf
-        for s in successors:
-            s.f = max(s.path_cost + h(s), node.f)
-        while True:
-            # Order by lowest f value
-            successors.sort(key=lambda x: x.f)
-            best = successors[0]
-            if best.f > flimit:
-                return None, best.f
-            if len(successors) > 1:
-                alternative = successors[1].f
-            else:
-                alternative = inf
-            result, best.f = RBFS(problem, best, min(flimit, alternative))
-            if result is not None:
-                return result, best.f
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display, limits=limits, stats=stats)
+
+
+def anytime_weighted_astar_search(problem, h=None, display=False, f=None, weights=(1.2, 1.1, 1.05, 1),
+                                  callback=None, max_seconds=None):
+    """Anytime Repairing A* (ARA*) [Likhachev et al., 2003].
+    Runs weighted A* searches, with f(n) = g(n) + w*h(n), for decreasing
+    weights w. Each search quickly finds a goal whose cost is at most w times
+    the optimal one, and reuses the frontier of the previous search: nodes
+    improved after being expanded are kept aside and queued again for the next
+    weight, instead of being expanded again in the same search.
+    Every time a better goal is found, and after the search for each weight,
+    callback(node, bound) is called with the best goal so far, where bound is
+    the current suboptimality bound (the cost of the goal divided by a lower
+    bound of the optimal cost). If max_seconds is given, the search stops
+    after that time. Returns the best goal node found (None if there is none),
+    which is optimal if the search was not stopped and h is consistent. If
+    the search was stopped before finding any goal, a SearchResult with
+    status LIMIT is returned instead, so that this is not taken for an
+    infeasible problem.
+    As in astar_search, pass f instead of h if the problem already computes
+    f(n) for each node."""
+    if f is not None:
+        h = lambda n: f(n) - n.path_cost
+    else:
+        h = memoize(h or problem.h, 'h')
+    deadline = None if max_seconds is None else time.time() + max_seconds
+    incumbent = None
+    expanded = 0
+
+    def cost(node):
+        return inf if node is None else node.path_cost
+
+    def suboptimality_bound(weight, nodes):
+        lower_bound = min((n.path_cost + h(n) for n in nodes), default=inf)
+        if lower_bound >= cost(incumbent):
+            return 1
+        return min(weight, cost(incumbent) / lower_bound) if lower_bound > 0 else weight
 
     node = Node(problem.initial)
-    node.f = h(node)
-    result, bestf = RBFS(problem, node, inf)
-    return result
-
+    if problem.goal_test(node.state):
+        return node
+    best = {node.state: node}    # Best node found for each state
+    inconsistent = {}            # Nodes improved after their state was expanded, by state
+    frontier = [node]
+
+    for weight in weights:
+        open_list = IndexedPriorityQueue('min', lambda n: n.path_cost + weight * h(n))
+        open_list.extend(frontier)
+        open_list.extend(inconsistent.values())
+        inconsistent = {}
+        closed = set()
+
+        while open_list:
+            if deadline is not None and time.time() > deadline:
+                if display:
+                    print(expanded, "paths have been expanded before the deadline")
+                if incumbent is None:
+                    return SearchResult(SearchResult.LIMIT, None, 'max_seconds', expanded, len(open_list))
+                return incumbent
+            node = open_list.pop()
+            if node.path_cost + weight * h(node) >= cost(incumbent):
+                open_list.append(node)    # No better goal can be found with this weight
+                break
+            if node.state in closed:
+                continue
+            closed.add(node.state)
+            expanded += 1
+            for child in node.expand(problem):
+                if h(child) == inf:    # No goal can be reached from child
+                    continue
+                if child.state in best and best[child.state].path_cost <= child.path_cost:
+                    continue
+                best[child.state] = child
+                if problem.goal_test(child.state):
+                    if child.path_cost < cost(incumbent):
+                        incumbent = child
+                        if callback is not None:
+                            callback(incumbent, suboptimality_bound(weight, list(open_list.entries) +
+                                                                    list(inconsistent.values())))
+                elif child.state in closed:
+                    inconsistent[child.state] = child
+                else:
+                    open_list.append(child)
 
-def hill_climbing(problem):
-    """
-    [Figure 4.2]
-    From the initial node, keep choosing the neighbor with highest value,
-    stopping when no neighbor is better.
-    """
-    current = Node(problem.initial)
-    while True:
-        neighbors = current.expand(problem)
-        if not neighbors:
-            break
-        neighbor = argmax_random_tie(neighbors, key=lambda node: problem.value(node.state))
-        if problem.value(neighbor.state) <= problem.value(current.state):
+        # Nodes with key >= cost of the incumbent are kept for the next (smaller) weight
+        frontier = list(open_list.entries)
+        if callback is not None and incumbent is not None:
+            callback(incumbent, suboptimality_bound(weight, frontier + list(inconsistent.values())))
+        if not frontier and not inconsistent:
             break
-        current = neighbor
-    return current.state
-
-
-def exp_schedule(k=20, lam=0.005, limit=100):
-    """One possible schedule function for simulated annealing"""
-    return lambda t: (k * math.exp(-lam * t) if t < limit else 0)
-
-
-def simulated_annealing(problem, schedule=exp_schedule()):
-    """[Figure 4.5] CAUTION: This differs from the pseudocode as it
-    returns a state instead of a Node."""
-    current = Node(problem.initial)
-    for t in range(sys.maxsize):
-        T = schedule(t)
-        if T == 0:
-            return current.state
-        neighbors = current.expand(problem)
-        if not neighbors:
-            return current.state
-        next_choice = random.choice(neighbors)
-        delta_e = problem.value(next_choice.state) - problem.value(current.state)
-        if delta_e > 0 or probability(math.exp(delta_e / T)):
-            current = next_choice
-
-
-def simulated_annealing_full(problem, schedule=exp_schedule()):
-    """ This version returns all the states encountered in reaching 
-    the goal state."""
-    states = []
-    current = Node(problem.initial)
-    for t in range(sys.maxsize):
-        states.append(current.state)
-        T = schedule(t)
-        if T == 0:
-            return states
-        neighbors = current.expand(problem)
-        if not neighbors:
-            return current.state
-        next_choice = random.choice(neighbors)
-        delta_e = problem.value(next_choice.state) - problem.value(current.state)
-        if delta_e > 0 or probability(math.exp(delta_e / T)):
-            current = next_choice
-
-
-def and_or_graph_search(problem):
-    """[Figure 4.11]Used when the environment is nondeterministic and completely observable.
-    Contains OR nodes where the agent is free to choose any action.
-    After every action there is an AND node which contains all possible states
-    the agent may reach due to stochastic nature of environment.
-    The agent must be able to handle all possible states of the AND node (as it
-    may end up in any of them).
-    Returns a conditional plan to reach goal state,
-    or failure if the former is not possible."""
-
-    # functions used by and_or_search
-    def or_search(state, problem, path):
-        """returns a plan as a list of actions"""
-        if problem.goal_test(state):
-            return []
-        if state in path:
-            return None
-        for action in problem.actions(state):
-            plan = and_search(problem.result(state, action),
-                              problem, path + [state, ])
-            if plan is not None:
-                return [action, plan]
-
-    def and_search(states, problem, path):
-        """Returns plan in form of dictionary where we take action plan[s] if we reach state s."""
-        plan = {}
-        for s in states:
-            plan[s] = or_search(s, problem, path)
-            if plan[s] is None:
-                return None
-        return plan
-
-    # body of and or search
-    return or_search(problem.initial, problem, [])
-
-
-# Pre-defined actions for PeakFindingProblem
-directions4 = {'W': (-1, 0), 'N': (0, 1), 'E': (1, 0), 'S': (0, -1)}
-directions8 = dict(directions4)
-directions8.update({'NW': (-1, 1), 'NE': (1, 1), 'SE': (1, -1), 'SW': (-1, -1)})
-
-
-class PeakFindingProblem(Problem):
-    """Problem of finding the highest peak in a limited grid"""
-
-    def __init__(self, initial, grid, defined_actions=directions4):
-        """The grid is a 2 dimensional array/list whose state is specified by tuple of indices"""
-        super().__init__(initial)
-        self.grid = grid
-        self.defined_actions = defined_actions
-        self.n = len(grid)
-        assert self.n > 0
-        self.m = len(grid[0])
-        assert self.m > 0
-
-    def actions(self, state):
-        """Returns the list of actions which are allowed to be taken from the given state"""
-        allowed_actions = []
-        for action in self.defined_actions:
-            next_state = vector_add(state, self.defined_actions[action])
-            if 0 <= next_state[0] <= self.n - 1 and 0 <= next_state[1] <= self.m - 1:
-                allowed_actions.append(action)
-
-        return allowed_actions
-
-    def result(self, state, action):
-        """Moves in the direction specified by action"""
-        return vector_add(state, self.defined_actions[action])
-
-    def value(self, state):
-        """Value of a state is the value it is the index to"""
-        x, y = state
-        assert 0 <= x < self.n
-        assert 0 <= y < self.m
-        return self.grid[x][y]
-
 
-class OnlineDFSAgent:
-    """
-    [Figure 4.21]
-    The abstract class for an OnlineDFSAgent. Override
-    update_state method to convert percept to state. While initializing
-    the subclass a problem needs to be provided which is an instance of
-    a subclass of the Problem class.
-    """
-
-    def __init__(self, problem):
-        self.problem = problem
-        self.s = None
-        self.a = None
-        self.untried = dict()
-        self.unbacktracked = dict()
-        self.result = {}
-
-    def __call__(self, percept):
-        s1 = self.update_state(percept)
-        if self.problem.goal_test(s1):
-            self.a = None
-        else:
-            if s1 not in self.untried.keys():
-                self.untried[s1] = self.problem.actions(s1)
-            if self.s is not None:
-                if s1 != self.result[(self.s, self.a)]:
-                    self.result[(self.s, self.a)] = s1
-                    self.unbacktracked[s1].insert(0, self.s)
-            if len(self.untried[s1]) == 0:
-                if len(self.unbacktracked[s1]) == 0:
-                    self.a = None
+    if display:
+        print(expanded, "paths have been expanded")
+    return incumbent
+
+
+def _hda_worker(problem, f, index, inboxes, results, lock, sent, received, idle, incumbent, done, batch_size):
+    """One process of hash_distributed_astar_search. It owns the states whose
+    hash modulo the number of workers is index: it keeps their frontier and the
+    lowest path cost found for each of them, expands them and sends the
+    children owned by other workers to their inboxes, in batches of (state,
+    path_cost, depth, actions) tuples. Goals better than the incumbent are put
+    in results as (path_cost, actions), and (None, expanded) at the end."""
+    import queue
+
+    inbox = inboxes[index]
+    frontier = IndexedPriorityQueue('min', f)
+    best = {}     # Lowest path cost found for each owned state
+    paths = {}    # Actions from the initial state to each node in the frontier
+    outboxes = [[] for _ in inboxes]
+    expanded = 0
+
+    def add(node, actions):
+        if f(node) >= incumbent.value:    # Cannot lead to a better goal
+            return
+        if node.state in best and best[node.state] <= node.path_cost:
+            return
+        best[node.state] = node.path_cost
+        paths[node.state] = actions
+        frontier.append(node)    # Replaces a worse node of the same state
+
+    def receive(batch):
+        with lock:
+            received.value += len(batch)
+            idle[index] = 0
+        for state, path_cost, depth, actions in batch:
+            node = Node(state, path_cost=path_cost)
+            node.depth = depth
+            add(node, actions)
+
+    def flush(owner):
+        with lock:
+            sent.value += len(outboxes[owner])
+        inboxes[owner].put(outboxes[owner])
+        outboxes[owner] = []
+
+    while not done.is_set():
+        batches = []
+        try:
+            while True:
+                batches.append(inbox.get_nowait())
+        except queue.Empty:
+            pass
+        if not batches and not frontier:
+            # Idle: the search is over when every worker is idle and no batch is on its way
+            with lock:
+                idle[index] = 1
+                if all(idle) and sent.value == received.value:
+                    done.set()
+            try:
+                batches.append(inbox.get(timeout=0.01))
+            except queue.Empty:
+                continue
+        for batch in batches:
+            receive(batch)
+
+        for _ in range(batch_size):
+            if not frontier:
+                break
+            node = frontier.pop()
+            actions = paths.pop(node.state)
+            if f(node) >= incumbent.value:
+                continue
+            if problem.goal_test(node.state):
+                with incumbent.get_lock():
+                    if node.path_cost < incumbent.value:
+                        incumbent.value = node.path_cost
+                        results.put((node.path_cost, actions))
+                continue
+            expanded += 1
+            for child in node.expand(problem):
+                owner = hash(child.state) % len(inboxes)
+                if owner == index:
+                    add(child, actions + (child.action,))
                 else:
-                    # else a <- an action b such that result[s', b] = POP(unbacktracked[s'])
-                    unbacktracked_pop = self.unbacktracked.pop(s1)
-                    for (s, b) in self.result.keys():
-                        if self.result[(s, b)] == unbacktracked_pop:
-                            self.a = b
-                            break
-            else:
-                self.a = self.untried.pop(s1)
-        self.s = s1
-        return self.a
-
-    def update_state(self, percept):
-        """To be overridden in most cases. The default case
-        assumes the percept to be of type state."""
-        return percept
-
-
-# ______________________________________________________________________________
-
-
-class OnlineSearchProblem(Problem):
-    """
-    A problem which is solved by an agent executing
-    actions, rather than by just computation.
-    Carried in a deterministic and a fully observable environment."""
-
-    def __init__(self, initial, goal, graph):
-        super().__init__(initial, goal)
-        self.graph = graph
-
-    def actions(self, state):
-        return self.graph.graph_dict[state].keys()
-
-    def output(self, state, action):
-        return self.graph.graph_dict[state][action]
-
-    def h(self, state):
-        """Returns least possible cost to reach a goal for the given state."""
-        return self.graph.least_costs[state]
-
-    def c(self, s, a, s1):
-        """Returns a cost estimate for an agent to move from state 's' to state 's1'."""
-        return 1
-
-    def update_state(self, percept):
-        raise NotImplementedError
-
-    def goal_test(self, state):
-        if state == self.goal:
-            return True
-        return False
-
-
-class LRTAStarAgent:
-    """ [Figure 4.24]
-    Abstract class for LRTA*-Agent. A problem needs to be
-    provided which is an instance of a subclass of Problem Class.
-
-    Takes a OnlineSearchProblem [Figure 4.23] as a problem.
-    """
-
-    def __init__(self, problem):
-        self.problem = problem
-        # self.result = {}      # no need as we are using problem.result
-        self.H = {}
-        self.s = None
-        self.a = None
-
-    def __call__(self, s1):  # as of now s1 is a state rather than a percept
-        if self.problem.goal_test(s1):
-            self.a = None
-            return self.a
-        else:
-            if s1 not in self.H:
-                self.H[s1] = self.problem.h(s1)
-            if self.s is not None:
-                # self.result[(self.s, self.a)] = s1    # no need as we are using problem.output
-
-                # minimum cost for action b in problem.actions(s)
-                self.H[self.s] = min(self.LRTA_cost(self.s, b, self.problem.output(self.s, b),
-                                                    self.H) for b in self.problem.actions(self.s))
-
-            # an action b in problem.actions(s1) that minimizes costs
-            self.a = argmin(self.problem.actions(s1),
-                            key=lambda b: self.LRTA_cost(s1, b, self.problem.output(s1, b), self.H))
-
-            self.s = s1
-            return self.a
-
-    def LRTA_cost(self, s, a, s1, H):
-        """Returns cost to move from state 's' to state 's1' plus
-        estimated cost to get to goal from s1."""
-        print(s, a, s1)
-        if s1 is None:
-            return self.problem.h(s)
-        else:
-            # sometimes we need to get H[s1] which we haven't yet added to H
-            # to replace this try, except: we can initialize H with values from problem.h
+                    outboxes[owner].append((child.state, child.path_cost, child.depth, actions + (child.action,)))
+                    if len(outboxes[owner]) >= batch_size:
+                        flush(owner)
+        for owner, outbox in enumerate(outboxes):
+            if outbox:
+                flush(owner)
+
+    results.put((None, expanded))
+
+
+def hash_distributed_astar_search(problem, h=None, display=False, f=None, workers=None, batch_size=64):
+    """Hash Distributed A* (HDA*) [Kishimoto et al., 2009].
+    Runs A* in workers processes (one per core by default). Each state is
+    owned by the worker given by its hash modulo the number of workers, which
+    keeps its frontier and detects its duplicates; children are sent to their
+    owners in batches. Workers expand nodes in f order until none of their
+    nodes can lead to a goal better than the best one found so far, which is
+    shared by all of them. The search ends when all workers are idle and no
+    batch is on its way, so the goal returned is optimal (for an admissible
+    h), as with astar_search, or None if there is none.
+    The states must be picklable and their hash the same in every process
+    (child processes are forked where possible, so hash randomization does
+    not matter). As in astar_search, pass f instead of h if the problem
+    already computes f(n) for each node."""
+    import multiprocessing
+    import queue
+
+    if f is None:
+        h = h or problem.h
+        f = lambda n: n.path_cost + h(n)
+    workers = workers or multiprocessing.cpu_count()
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    lock = context.Lock()
+    sent = context.Value('q', 1, lock=False)
+    received = context.Value('q', 0, lock=False)
+    idle = context.Array('b', workers, lock=False)
+    incumbent = context.Value('d', inf)
+    done = context.Event()
+
+    root = Node(problem.initial)
+    inboxes[hash(root.state) % workers].put([(root.state, root.path_cost, root.depth, ())])
+    processes = [context.Process(target=_hda_worker, daemon=True,
+                                 args=(problem, f, index, inboxes, results, lock, sent, received, idle, incumbent,
+                                       done, batch_size))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    goal_cost, goal_actions, expanded, finished = inf, None, 0, 0
+    try:
+        while finished < workers:
             try:
-                return self.problem.c(s, a, s1) + self.H[s1]
-            except:
-                return self.problem.c(s, a, s1) + self.problem.h(s1)
-
-
-# ______________________________________________________________________________
-# Genetic Algorithm
-
-
-def genetic_search(problem, ngen=1000, pmut=0.1, n=20):
-    """Call genetic_algorithm on the appropriate parts of a problem.
-    This requires the problem to have states that can mate and mutate,
-    plus a value method that scores states."""
-
-    # NOTE: This is not tested and might not work.
-    # TODO: Use this function to make Problems work with genetic_algorithm.
-
-    s = problem.initial_state
-    states = [problem.result(s, a) for a in problem.actions(s)]
-    random.shuffle(states)
-    return genetic_algorithm(states[:n], problem.value, ngen, pmut)
-
-
-def genetic_algorithm(population, fitness_fn, gene_pool=[0, 1], f_thres=None, ngen=1000, pmut=0.1):
-    """[Figure 4.8]"""
-    for i in range(ngen):
-        population = [mutate(recombine(*select(2, population, fitness_fn)), gene_pool, pmut)
-                      for i in range(len(population))]
-
-        fittest_individual = fitness_threshold(fitness_fn, f_thres, population)
-        if fittest_individual:
-            return fittest_individual
-
-    return argmax(population, key=fitness_fn)
-
-
-def fitness_threshold(fitness_fn, f_thres, population):
-    if not f_thres:
+                cost, value = results.get(timeout=0.1)
+            except queue.Empty:
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    raise RuntimeError("a worker of the parallel search failed")
+                continue
+            if cost is None:
+                expanded += value
+                finished += 1
+            elif cost < goal_cost:
+                goal_cost, goal_actions = cost, value
+    finally:
+        # Also stops the workers if the search is interrupted (a timeout, KeyboardInterrupt...)
+        done.set()
+        for process in processes:
+            if finished < workers:
+                process.terminate()
+            process.join()
+        if finished < workers:
+            for inbox in inboxes:
+                inbox.cancel_join_thread()
+
+    if display:
+        print(expanded, "paths have been expanded by", workers, "workers")
+    if goal_actions is None:
         return None
+    node = root
+    for action in goal_actions:
+        node = node.child_node(problem, action)
+    return node
 
-    fittest_individual = argmax(population, key=fitness_fn)
-    if fitness_fn(fittest_individual) >= f_thres:
-        return fittest_individual
-
-    return None
-
-
-def init_population(pop_number, gene_pool, state_length):
-    """Initializes population for genetic algorithm
-    pop_number  :  Number of individuals in population
-    gene_pool   :  List of possible values for individuals
-    state_length:  The length of each individual"""
-    g = len(gene_pool)
-    population = []
-    for i in range(pop_number):
-        new_individual = [gene_pool[random.randrange(0, g)] for j in range(state_length)]
-        population.append(new_individual)
-
-    return population
-
-
-def select(r, population, fitness_fn):
-    fitnesses = map(fitness_fn, population)
-    sampler = weighted_sampler(population, fitnesses)
-    return [sampler() for i in range(r)]
-
-
-def recombine(x, y):
-    n = len(x)
-    c = random.randrange(0, n)
-    return x[:c] + y[c:]
-
-
-def recombine_uniform(x, y):
-    n = len(x)
-    result = [0] * n
-    indexes = random.sample(range(n), n)
-    for i in range(n):
-        ix = indexes[i]
-        result[ix] = x[ix] if i < n / 2 else y[ix]
-
-    return ''.join(str(r) for r in result)
-
-
-def mutate(x, gene_pool, pmut):
-    if random.uniform(0, 1) >= pmut:
-        return x
-
-    n = len(x)
-    g = len(gene_pool)
-    c = random.randrange(0, n)
-    r = random.randrange(0, g)
-
-    new_gene = gene_pool[r]
-    return x[:c] + [new_gene] + x[c + 1:]
-
-
-# _____________________________________________________________________________
-# The remainder of this file implements examples for the search algorithms.
 
 # ______________________________________________________________________________
-# Graphs and Graph Problems
-
-
-class Graph:
-    """A graph connects nodes (vertices) by edges (links). Each edge can also
-    have a length associated with it. The constructor call is something like:
-        g = Graph({'A': {'B': 1, 'C': 2})
-    this makes a graph with 3 nodes, A, B, and C, with an edge of length 1 from
-    A to B,  and an edge of length 2 from A to C. You can also do:
-        g = Graph({'A': {'B': 1, 'C': 2}, directed=False)
-    This makes an undirected graph, so inverse links are also added. The graph
-    stays undirected; if you add more links with g.connect('B', 'C', 3), then
-    inverse link is also added. You can use g.nodes() to get a list of nodes,
-    g.get('A') to get a dict of links out of A, and g.get('A', 'B') to get the
-    length of the link from A to B. 'Lengths' can actually be any object at
-    all, and nodes can be any hashable object."""
-
-    def __init__(self, graph_dict=None, directed=True):
-        self.graph_dict = graph_dict or {}
-        self.directed = directed
-        if not directed:
-            self.make_undirected()
-
-    def make_undirected(self):
-        """Make a digraph into an undirected graph by adding symmetric edges."""
-        for a in list(self.graph_dict.keys()):
-            for (b, dist) in self.graph_dict[a].items():
-                self.connect1(b, a, dist)
-
-    def connect(self, A, B, distance=1):
-        """Add a link from A and B of given distance, and also add the inverse
-        link if the graph is undirected."""
-        self.connect1(A, B, distance)
-        if not self.directed:
-            self.connect1(B, A, distance)
-
-    def connect1(self, A, B, distance):
-        """Add a link from A to B of given distance, in one direction only."""
-        self.graph_dict.setdefault(A, {})[B] = distance
-
-    def get(self, a, b=None):
-        """Return a link distance or a dict of {node: distance} entries.
-        .get(a,b) returns the distance or None;
-        .get(a) returns a dict of {node: distance} entries, possibly {}."""
-        links = self.graph_dict.setdefault(a, {})
-        if b is None:
-            return links
-        else:
-            return links.get(b)
-
-    def nodes(self):
-        """Return a list of nodes in the graph."""
-        s1 = set([k for k in self.graph_dict.keys()])
-        s2 = set([k2 for v in self.graph_dict.values() for k2, v2 in v.items()])
-        nodes = s1.union(s2)
-        return list(nodes)
-
-
-def UndirectedGraph(graph_dict=None):
-    """Build a Graph where every edge (including future ones) goes both ways."""
-    return Graph(graph_dict=graph_dict, directed=False)
-
-
-def RandomGraph(nodes=list(range(10)), min_links=2, width=400, height=300,
-                curvature=lambda: random.uniform(1.1, 1.5)):
-    """Construct a random graph, with the specified nodes, and random links.
-    The nodes are laid out randomly on a (width x height) rectangle.
-    Then each node is connected to the min_links nearest neighbors.
-    Because inverse links are added, some nodes will have more connections.
-    The distance between nodes is the hypotenuse times curvature(),
-    where curvature() defaults to a random number between 1.1 and 1.5."""
-    g = UndirectedGraph()
-    g.locations = {}
-    # Build the cities
-    for node in nodes:
-        g.locations[node] = (random.randrange(width), random.randrange(height))
-    # Build roads from each city to at least min_links nearest neighbors.
-    for i in range(min_links):
-        for node in nodes:
-            if len(g.get(node)) < min_links:
-                here = g.locations[node]
-
-                def distance_to_node(n):
-                    if n is node or g.get(node, n):
-                        return inf
-                    return distance(g.locations[n], here)
-
-                neighbor = argmin(nodes, key=distance_to_node)
-                d = distance(g.locations[neighbor], here) * curvature()
-                g.connect(node, neighbor, int(d))
-    return g
-
-
-""" [Figure 3.2]
-Simplified road map of Romania
-"""
-romania_map = UndirectedGraph(dict(
-    Arad=dict(Zerind=75, Sibiu=140, Timisoara=118),
-    Bucharest=dict(Urziceni=85, Pitesti=101, Giurgiu=90, Fagaras=211),
-    Craiova=dict(Drobeta=120, Rimnicu=146, Pitesti=138),
-    Drobeta=dict(Mehadia=75),
-    Eforie=dict(Hirsova=86),
-    Fagaras=dict(Sibiu=99),
-    Hirsova=dict(Urziceni=98),
-    Iasi=dict(Vaslui=92, Neamt=87),
-    Lugoj=dict(Timisoara=111, Mehadia=70),
-    Oradea=dict(Zerind=71, Sibiu=151),
-    Pitesti=dict(Rimnicu=97),
-    Rimnicu=dict(Sibiu=80),
-    Urziceni=dict(Vaslui=142)))
-romania_map.locations = dict(
-    Arad=(91, 492), Bucharest=(400, 327), Craiova=(253, 288),
-    Drobeta=(165, 299), Eforie=(562, 293), Fagaras=(305, 449),
-    Giurgiu=(375, 270), Hirsova=(534, 350), Iasi=(473, 506),
-    Lugoj=(165, 379), Mehadia=(168, 339), Neamt=(406, 537),
-    Oradea=(131, 571), Pitesti=(320, 368), Rimnicu=(233, 410),
-    Sibiu=(207, 457), Timisoara=(94, 410), Urziceni=(456, 350),
-    Vaslui=(509, 444), Zerind=(108, 531))
-
-""" [Figure 4.9]
-Eight possible states of the vacumm world
-Each state is represented as
-   *       "State of the left room"      "State of the right room"   "Room in which the agent
-                                                                      is present"
-1 - DDL     Dirty                         Dirty                       Left
-2 - DDR     Dirty                         Dirty                       Right
-3 - DCL     Dirty                         Clean                       Left
-4 - DCR     Dirty                         Clean                       Right
-5 - CDL     Clean                         Dirty                       Left
-6 - CDR     Clean                         Dirty                       Right
-7 - CCL     Clean                         Clean                       Left
-8 - CCR     Clean                         Clean                       Right
-"""
-vacuum_world = Graph(dict(
-    State_1=dict(Suck=['State_7', 'State_5'], Right=['State_2']),
-    State_2=dict(Suck=['State_8', 'State_4'], Left=['State_2']),
-    State_3=dict(Suck=['State_7'], Right=['State_4']),
-    State_4=dict(Suck=['State_4', 'State_2'], Left=['State_3']),
-    State_5=dict(Suck=['State_5', 'State_1'], Right=['State_6']),
-    State_6=dict(Suck=['State_8'], Left=['State_5']),
-    State_7=dict(Suck=['State_7', 'State_3'], Right=['State_8']),
-    State_8=dict(Suck=['State_8', 'State_6'], Left=['State_7'])
-))
-
-""" [Figure 4.23]
-One-dimensional state space Graph
-"""
-one_dim_state_space = Graph(dict(
-    State_1=dict(Right='State_2'),
-    State_2=dict(Right='State_3', Left='State_1'),
-    State_3=dict(Right='State_4', Left='State_2'),
-    State_4=dict(Right='State_5', Left='State_3'),
-    State_5=dict(Right='State_6', Left='State_4'),
-    State_6=dict(Left='State_5')
-))
-one_dim_state_space.least_costs = dict(
-    State_1=8,
-    State_2=9,
-    State_3=2,
-    State_4=2,
-    State_5=4,
-    State_6=3)
-
-""" [Figure 6.1]
-Principal states and territories of Australia
-"""
-australia_map = UndirectedGraph(dict(
-    T=dict(),
-    SA=dict(WA=1, NT=1, Q=1, NSW=1, V=1),
-    NT=dict(WA=1, Q=1),
-    NSW=dict(Q=1, V=1)))
-australia_map.locations = dict(WA=(120, 24), NT=(135, 20), SA=(135, 30),
-                               Q=(145, 20), NSW=(145, 32), T=(145, 42),
-                               V=(145, 37))
-
-
-class GraphProblem(Problem):
-    """The problem of searching a graph from one node to another."""
-
-    def __init__(self, initial, goal, graph):
-        super().__init__(initial, goal)
-        self.graph = graph
-
-    def actions(self, A):
-        """The actions at a graph node are just its neighbors."""
-        return list(self.graph.get(A).keys())
-
-    def result(self, state, action):
-        """The result of going to a neighbor is just that neighbor."""
-        return action
-
-    def path_cost(self, cost_so_far, A, action, B):
-        return cost_so_far + (self.graph.get(A, B) or inf)
-
-    def find_min_edge(self):
-        """Find minimum value of edges."""
-        m = inf
-        for d in self.graph.graph_dict.values():
-            local_min = min(d.values())
-            m = min(m, local_min)
-
-        return m
-
-    def h(self, node):
-        """h function is straight-line distance from a node's state to goal."""
-        locs = getattr(self.graph, 'locations', None)
-        if locs:
-            if type(node) is str:
-                return int(distance(locs[node], locs[self.goal]))
-
-            return int(distance(locs[node.state], locs[self.goal]))
-        else:
-            return inf
-
-
-class GraphProblemStochastic(GraphProblem):
-    """
-    A version of GraphProblem where an action can lead to
-    nondeterministic output i.e. multiple possible states.
-
-    Define the graph as dict(A = dict(Action = [[<Result 1>, <Result 2>, ...], <cost>], ...), ...)
-    A the dictionary format is different, make sure the graph is created as a directed graph.
-    """
-
-    def result(self, state, action):
-        return self.graph.get(state, action)
-
-    def path_cost(self):
-        raise NotImplementedError
-
-
-# ______________________________________________________________________________
-
-
-class NQueensProblem(Problem):
-    """The problem of placing N queens on an NxN board with none attacking
-    each other. A state is represented as an N-element array, where
-    a value of r in the c-th entry means there is a queen at column c,
-    row r, and a value of -1 means that the c-th column has not been
-    filled in yet. We fill in columns left to right.
-    >>> depth_first_tree_search(NQueensProblem(8))
-    <Node (7, 3, 0, 2, 5, 1, 6, 4)>
-    """
-
-    def __init__(self, N):
-        super().__init__(tuple([-1] * N))
-        self.N = N
-
-    def actions(self, state):
-        """In the leftmost empty column, try all non-conflicting rows."""
-        if state[-1] is not -1:
-            return []  # All columns filled; no successors
-        else:
-            col = state.index(-1)
-            return [row for row in range(self.N)
-                    if not self.conflicted(state, row, col)]
-
-    def result(self, state, row):
-        """Place the next queen at the given row."""
-        col = state.index(-1)
-        new = list(state[:])
-        new[col] = row
-        return tuple(new)
-
-    def conflicted(self, state, row, col):
-        """Would placing a queen at (row, col) conflict with anything?"""
-        return any(self.conflict(row, col, state[c], c)
-                   for c in range(col))
-
-    def conflict(self, row1, col1, row2, col2):
-        """Would putting two queens in (row1, col1) and (row2, col2) conflict?"""
-        return (row1 == row2 or  # same row
-                col1 == col2 or  # same column
-                row1 - col1 == row2 - col2 or  # same \ diagonal
-                row1 + col1 == row2 + col2)  # same / diagonal
-
-    def goal_test(self, state):
-        """Check if all columns filled, no conflicts."""
-        if state[-1] is -1:
-            return False
-        return not any(self.conflicted(state, state[col], col)
-                       for col in range(len(state)))
-
-    def h(self, node):
-        """Return number of conflicting queens for a given node"""
-        num_conflicts = 0
-        for (r1, c1) in enumerate(node.state):
-            for (r2, c2) in enumerate(node.state):
-                if (r1, c1) != (r2, c2):
-                    num_conflicts += self.conflict(r1, c1, r2, c2)
-
-        return num_conflicts
-
-
-# ______________________________________________________________________________
-# Inverse Boggle: Search for a high-scoring Boggle board. A good domain for
-# iterative-repair and related search techniques, as suggested by Justin Boyan.
-
-
-ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-
-cubes16 = ['FORIXB', 'MOQABJ', 'GURILW', 'SETUPL',
-           'CMPDAE', 'ACITAO', 'SLCRAE', 'ROMASH',
-           'NODESW', 'HEFIYE', 'ONUDTK', 'TEVIGN',
-           'ANEDVZ', 'PINESH', 'ABILYT', 'GKYLEU']
-
-
-def random_boggle(n=4):
-    """Return a random Boggle board of size n x n.
-    We represent a board as a linear list of letters."""
-    cubes = [cubes16[i % 16] for i in range(n * n)]
-    random.shuffle(cubes)
-    return list(map(random.choice, cubes))
-
-
-# The best 5x5 board found by Boyan, with our word list this board scores
-# 2274 words, for a score of 9837
-
-
-boyan_best = list('RSTCSDEIAEGNLRPEATESMSSID')
-
-
-def print_boggle(board):
-    """Print the board in a 2-d array."""
-    n2 = len(board)
-    n = exact_sqrt(n2)
-    for i in range(n2):
-
-        if i % n == 0 and i > 0:
-            print()
-        if board[i] == 'Q':
-            print('Qu', end=' ')
-        else:
-            print(str(board[i]) + ' ', end=' ')
-    print()
-
-
-def boggle_neighbors(n2, cache={}):
-    """Return a list of lists, where the i-th element is the list of indexes
-    for the neighbors of square i."""
-    if cache.get(n2):
-        return cache.get(n2)
-    n = exact_sqrt(n2)
-    neighbors = [None] * n2
-    for i in range(n2):
-        neighbors[i] = []
-        on_top = i < n
-        on_bottom = i >= n2 - n
-        on_left = i % n == 0
-        on_right = (i + 1) % n == 0
-        if not on_top:
-            neighbors[i].append(i - n)
-            if not on_left:
-                neighbors[i].append(i - n - 1)
-            if not on_right:
-                neighbors[i].append(i - n + 1)
-        if not on_bottom:
-            neighbors[i].append(i + n)
-            if not on_left:
-                neighbors[i].append(i + n - 1)
-            if not on_right:
-                neighbors[i].append(i + n + 1)
-        if not on_left:
-            neighbors[i].append(i - 1)
-        if not on_right:
-            neighbors[i].append(i + 1)
-    cache[n2] = neighbors
-    return neighbors
-
-
-def exact_sqrt(n2):
-    """If n2 is a perfect square, return its square root, else raise error."""
-    n = int(math.sqrt(n2))
-    assert n * n == n2
-    return n
-
-
-# _____________________________________________________________________________
-
-
-class Wordlist:
-    """This class holds a list of words. You can use (word in wordlist)
-    to check if a word is in the list, or wordlist.lookup(prefix)
-    to see if prefix starts any of the words in the list."""
-
-    def __init__(self, file, min_len=3):
-        lines = file.read().upper().split()
-        self.words = [word for word in lines if len(word) >= min_len]
-        self.words.sort()
-        self.bounds = {}
-        for c in ALPHABET:
-            c2 = chr(ord(c) + 1)
-            self.bounds[c] = (bisect.bisect(self.words, c),
-                              bisect.bisect(self.words, c2))
-
-    def lookup(self, prefix, lo=0, hi=None):
-        """See if prefix is in dictionary, as a full word or as a prefix.
-        Return two values: the first is the lowest i such that
-        words[i].startswith(prefix), or is None; the second is
-        True iff prefix itself is in the Wordlist."""
-        words = self.words
-        if hi is None:
-            hi = len(words)
-        i = bisect.bisect_left(words, prefix, lo, hi)
-        if i < len(words) and words[i].startswith(prefix):
-            return i, (words[i] == prefix)
-        else:
-            return None, False
-
-    def __contains__(self, word):
-        return self.lookup(word)[1]
-
-    def __len__(self):
-        return len(self.words)
-
-
-# _____________________________________________________________________________
-
-
-class BoggleFinder:
-    """A class that allows you to find all the words in a Boggle board."""
-
-    wordlist = None  # A class variable, holding a wordlist
-
-    def __init__(self, board=None):
-        if BoggleFinder.wordlist is None:
-            BoggleFinder.wordlist = Wordlist(open_data("EN-text/wordlist.txt"))
-        self.found = {}
-        if board:
-            self.set_board(board)
-
-    def set_board(self, board=None):
-        """Set the board, and find all the words in it."""
-        if board is None:
-            board = random_boggle()
-        self.board = board
-        self.neighbors = boggle_neighbors(len(board))
-        self.found = {}
-        for i in range(len(board)):
-            lo, hi = self.wordlist.bounds[board[i]]
-            self.find(lo, hi, i, [], '')
-        return self
-
-    def find(self, lo, hi, i, visited, prefix):
-        """Looking in square i, find the words that continue the prefix,
-        considering the entries in self.wordlist.words[lo:hi], and not
-        revisiting the squares in visited."""
-        if i in visited:
-            return
-        wordpos, is_word = self.wordlist.lookup(prefix, lo, hi)
-        if wordpos is not None:
-            if is_word:
-                self.found[prefix] = True
-            visited.append(i)
-            c = self.board[i]
-            if c == 'Q':
-                c = 'QU'
-            prefix += c
-            for j in self.neighbors[i]:
-                self.find(wordpos, hi, j, visited, prefix)
-            visited.pop()
-
-    def words(self):
-        """The words found."""
-        return list(self.found.keys())
-
-    scores = [0, 0, 0, 0, 1, 2, 3, 5] + [11] * 100
-
-    def score(self):
-        """The total score for the words found, according to the rules."""
-        return sum([self.scores[len(w)] for w in self.words()])
+# Memory-bounded search
+
+
+def iterative_deepening_astar_search(problem, h=None, display=False, f=None):
+    """Iterative deepening A* (IDA*) search [Korf, 1985].
+    A sequence of depth-first searches that prune the nodes whose
+    f(n) = g(n)+h(n) exceeds a bound. The first bound is the f of the initial
+    node, and each new bound is the smallest f that exceeded the previous one,
+    so the first goal found is optimal if h is admissible. Only the current
+    path (and its siblings) is kept in memory. As in astar_search, pass f
+    instead of h if the problem already computes f(n) for each node."""
+    if f is None:
+        h = memoize(h or problem.h, 'h')
+        f = lambda n: n.path_cost + h(n)
+    expanded = 0
+
+    def bounded_dfs(node, bound, path):
+        nonlocal expanded
+        node_f = f(node)
+        if node_f > bound:
+            return None, node_f
+        if problem.goal_test(node.state):
+            return node, node_f
+        expanded += 1
+        next_bound = inf
+        # Children with lower f first, so the goal is found sooner in the last iteration
+        for child in sorted(node.expand(problem), key=f):
+            if child.state in path:
+                continue
+            path.add(child.state)
+            result, child_bound = bounded_dfs(child, bound, path)
+            path.remove(child.state)
+            if result is not None:
+                return result, child_bound
+            next_bound = min(next_bound, child_bound)
+        return None, next_bound
 
-    def __len__(self):
-        """The number of words found."""
-        return len(self.found)
-
-
-# _____________________________________________________________________________
-
-
-def boggle_hill_climbing(board=None, ntimes=100, verbose=True):
-    """Solve inverse Boggle by hill-climbing: find a high-scoring board by
-    starting with a random one and changing it."""
-    finder = BoggleFinder()
-    if board is None:
-        board = random_boggle()
-    best = len(finder.set_board(board))
-    for _ in range(ntimes):
-        i, oldc = mutate_boggle(board)
-        new = len(finder.set_board(board))
-        if new > best:
-            best = new
-            if verbose:
-                print(best, _, board)
-        else:
-            board[i] = oldc  # Change back
-    if verbose:
-        print_boggle(board)
-    return board, best
+    node = Node(problem.initial)
+    bound = f(node)
+    iterations = 0
+    result = None
+    while result is None and bound < inf:
+        iterations += 1
+        result, bound = bounded_dfs(node, bound, {node.state})
+    if display:
+        print(expanded, "paths have been expanded in", iterations, "iterations")
+    return result
 
 
-def mutate_boggle(board):
-    i = random.randrange(len(board))
-    oldc = board[i]
-    # random.choice(boyan_best)
-    board[i] = random.choice(random.choice(cubes16))
-    return i, oldc
+def depth_first_branch_and_bound_search(problem, h=None, display=False, f=None, incumbent=None, greedy=0,
+                                        transpositions=0, callback=None, max_seconds=None):
+    """Depth-first branch and bound (DFBnB) [Zhang and Korf, 1995].
+    A depth-first search that keeps the best goal found so far (the
+    incumbent) and prunes the nodes whose f(n) = g(n)+h(n) is not lower than
+    its cost, so the incumbent is optimal when the search ends if h is
+    admissible. It suits problems whose goals are all at the same depth, and
+    only keeps the current path and the siblings of its nodes in memory.
+    Children are searched in order of f (ties broken by the lowest path
+    cost), so that the first dives find good goals. An initial incumbent can
+    be given, or looked for with a greedy best-first search on h, expanding
+    at most greedy nodes. States reached again through another path (for
+    example, the same legs added in another order) are searched again unless
+    transpositions > 0: up to that many states are then remembered with the
+    lowest path cost they were reached with, and pruned when reached again
+    with a path cost that is not lower. callback(node) is called with every
+    new incumbent.
+    If max_seconds is given, the search stops after that time. Returns the
+    best goal node found (None if there is none), or a SearchResult with
+    status LIMIT if the search was stopped before finding any goal. As in
+    astar_search, pass f instead of h if the problem already computes f(n)
+    for each node."""
+    if f is None:
+        h = memoize(h or problem.h, 'h')
+        f = lambda n: n.path_cost + h(n)
+    else:
+        h = lambda n: f(n) - n.path_cost
+    deadline = None if max_seconds is None else time.time() + max_seconds
+    expanded = improvements = 0
+
+    if incumbent is None and greedy:
+        result = greedy_best_first_graph_search(problem, h, cache=False, limits=SearchLimits(max_expanded=greedy))
+        if result.status == SearchResult.OPTIMAL:
+            incumbent = result.node
+            if callback is not None:
+                callback(incumbent)
+    bound = inf if incumbent is None else incumbent.path_cost
+
+    def key(n):
+        return f(n), n.path_cost
+
+    # Children of each node of the current path still to be searched, the best one last
+    stack = [[Node(problem.initial)]]
+    seen = {}    # Lowest path cost of each remembered state
+    while stack:
+        if deadline is not None and expanded % 100 == 0 and time.time() > deadline:
+            if display:
+                print(expanded, "paths have been expanded before the deadline")
+            if incumbent is None:
+                return SearchResult(SearchResult.LIMIT, None, 'max_seconds', expanded, len(stack))
+            return incumbent
+        children = stack[-1]
+        if not children:
+            stack.pop()
+            continue
+        node = children.pop()
+        if f(node) >= bound:
+            stack.pop()    # The remaining siblings have a higher f
+            continue
+        if problem.goal_test(node.state):
+            incumbent, bound = node, node.path_cost
+            improvements += 1
+            if callback is not None:
+                callback(incumbent)
+            continue
+        if transpositions:
+            if seen.get(node.state, inf) <= node.path_cost:
+                continue
+            if node.state in seen or len(seen) < transpositions:
+                seen[node.state] = node.path_cost
+        expanded += 1
+        stack.append(sorted(node.expand(problem), key=key, reverse=True))
+
+    if display:
+        print(expanded, "paths have been expanded and the incumbent was improved", improvements, "times")
+    return incumbent
 
 
 # ______________________________________________________________________________
-
-# Code to compare searchers on various problems.
+# Instrumentation
 
 
 class InstrumentedProblem(Problem):
@@ -1547,26 +1089,11 @@ class InstrumentedProblem(Problem):
                                                self.states, str(self.found)[:4])
 
 
-def compare_searchers(problems, header,
-                      searchers=[breadth_first_tree_search,
-                                 breadth_first_graph_search,
-                                 depth_first_graph_search,
-                                 iterative_deepening_search,
-                                 depth_limited_search,
-                                 recursive_best_first_search]):
-    def do(searcher, problem):
-        p = InstrumentedProblem(problem)
-        searcher(p)
-        return p
-
-    table = [[name(s)] + [do(s, p) for p in problems] for s in searchers]
-    print_table(table, header)
-
-
-def compare_graph_searchers():
-    """Prints a table of search results."""
-    compare_searchers(problems=[GraphProblem('Arad', 'Bucharest', romania_map),
-                                GraphProblem('Oradea', 'Neamt', romania_map),
-                                GraphProblem('Q', 'WA', australia_map)],
-                      header=['Searcher', 'romania_map(Arad, Bucharest)',
-                              'romania_map(Oradea, Neamt)', 'australia_map'])
+def __getattr__(name):
+    """Import the rest of the AIMA search code the first time one of its names
+    is looked up (e.g. search.romania_map)."""
+    import search_aima
+    try:
+        return getattr(search_aima, name)
+    except AttributeError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name)) from None
@@ -1,10 +1,19 @@
 #!env/bin/python3.7
 
-from copy import deepcopy as copy_deepcopy
+import argparse
+import array
+from copy import copy as copy_copy
+import glob
+import json
+import mmap
 import os.path
+import signal
+import struct
+import sys
 from time import time
 
 import search
+from utils import inf, print_table
 
 
 class state:
@@ -14,23 +23,36 @@ class state:
 
     Attributes
     ----------
-    tod : list of strings
-        A list of string, where each string represents the time of departure of the i-th plane
-    schedule : list of lists of dictionaries
-        A list of schedules per plane. The first index corresponds to the plane and the second to the leg, with is a dictionary
-    remaining : list of dictionaries
-        A list of the remaining legs, that is, legs not yet assigned
+    tod : tuple of ints
+        A tuple of ints, where each int represents the time of departure of the i-th plane, in minutes since midnight.
+        It is None if the plane has no legs yet or if its schedule is full
+    schedule : tuple of tuples of ints
+        A tuple of schedules per plane. The first index corresponds to the plane and the second to the leg, which is a leg id.
+        The tuples are immutable, so a child state shares all the schedules of its parent except the one that changed
+    remaining : int
+        Bitmask of the remaining legs, that is, legs not yet assigned: bit i is set if the leg with id i remains
     g : float
         Value of the cost function
     h : float
         Value of the heuristic
 
+    The attributes are fixed (__slots__), so states don't carry an instance dictionary.
+    The remaining legs, schedules and tods are the canonical, hashable representation of the state
+
     Methods
     -------
+    __copy__(self)
+        Returns a shallow copy of the state
     __lt__(self, other)
         Compares each state through their evaluation function values: f(n)=g(n)+h(n)
+    __eq__(self, other)
+        Two states are equal if they have the same remaining legs, schedules and tods
+    __hash__(self)
+        Hashes the remaining legs, schedules and tods, so states can be stored in sets and dictionaries (e.g. the explored set of the search)
     """
 
+    __slots__ = ('tod', 'schedule', 'remaining', 'g', 'h')
+
     def __init__(self, nplanes=None, legs=None, g=0, h=0):
         """
         Parameters
@@ -41,21 +63,34 @@ class state:
             A list with the existing legs (default is None)
         """
 
-        if nplanes:
-            self.tod = [None for i in range(nplanes)]
-            self.schedule = [[] for i in range(nplanes)]
+        if nplanes is not None:
+            self.tod = tuple(None for i in range(nplanes))
+            self.schedule = tuple(() for i in range(nplanes))
         else:
             self.tod = None
             self.schedule = None
 
-        if legs:
-            self.remaining = [leg for leg in legs]
+        if legs is not None:
+            self.remaining = 0
+            for leg in legs:
+                self.remaining |= 1 << leg['id']
         else:
             self.remaining = None
 
         self.g = g
         self.h = h
 
+    def __copy__(self):
+        """Returns a shallow copy of the state (the tuples are shared)"""
+
+        new_state = state.__new__(state)
+        new_state.tod = self.tod
+        new_state.schedule = self.schedule
+        new_state.remaining = self.remaining
+        new_state.g = self.g
+        new_state.h = self.h
+        return new_state
+
     def __lt__(self, other):
         """Compares each state through their evaluation function values: f(n)=g(n)+h(n)
 
@@ -67,6 +102,21 @@ class state:
 
         return (self.g + self.h) < (other.g + other.h)
 
+    def __eq__(self, other):
+        """Two states are equal if they have the same remaining legs, schedules and tods
+
+        Returns
+        -------
+        bool
+            True if both states are equal, or False otherwise
+        """
+
+        return (isinstance(other, state) and self.remaining == other.remaining
+                and self.schedule == other.schedule and self.tod == other.tod)
+
+    def __hash__(self):
+        return hash((self.remaining, self.schedule, self.tod))
+
 
 class ASARProblem(search.Problem):
     """A class used to represent the ASAR problem, derived from the abstract class search.Problem (https://github.com/aimacode/aima-python)
@@ -76,9 +126,9 @@ class ASARProblem(search.Problem):
     Attributes
     ----------
     A : dictionary
-        Dictionary with available airports. The key is the airport code and the value is a dictionary with keys: start and end times
+        Dictionary with available airports. The key is the airport code and the value is a dictionary with keys: start and end times (in minutes)
     C : dictionary
-        Dictionary where the keys are the airplanes classes and the values are their rotation times
+        Dictionary where the keys are the airplanes classes and the values are their rotation times (in minutes)
     L : list of dictionaries
         List of dictionaries where each dictionary represents a leg.
         Each leg has as keys the departure and arrival airports and the available classes (which values correspond to the profits associated)
@@ -87,6 +137,41 @@ class ASARProblem(search.Problem):
     maxprofitall : float
         Corresponds to the maximum profit of all legs +1.
         This value will be used as a bound to calculate the linear cost with the given profit: cost = maxprofitall - profit
+    class_index : dictionary
+        Dictionary where the keys are the airplanes classes (those of C) and the values are their column in profits
+    profits : list of lists
+        Profit matrix: for each leg id, the list of its profits for each class (see class_index)
+    plane_profits : list of lists
+        For each airplane, the profit of each leg (indexed by leg id) when flown by that airplane (None if its class
+        is not in C)
+    plane_costs : list of lists
+        For each airplane, the cost (maxprofitall - profit) of each leg when flown by that airplane (None if its class
+        is not in C)
+    departures : dictionary
+        Dictionary where the keys are the airport codes and the values are lists with the ids of the legs departing from that airport
+    windows : list of tuples
+        Departure window of each leg, indexed by leg id (see get_windows)
+    turnarounds : dictionary
+        Dictionary where the keys are the airplanes classes and the values are lists, indexed by leg id,
+        with the leg duration plus the rotation time of the class (see get_turnarounds)
+    first_tods : dictionary
+        Dictionary where the keys are the airplanes classes and the values are lists, indexed by leg id,
+        with the tod of an empty airplane of that class after flying the leg (-1 if it can't)
+    symmetry : bool
+        If True, airplanes of the same class (and so with the same rotation time) are treated as interchangeable:
+        only the lowest-index empty airplane of each class is given a first leg, and their schedules are kept sorted
+        so that states which only differ by a permutation of these airplanes are equal
+    twins : list of tuples
+        For each airplane, the indexes of all the airplanes of the same class (including itself)
+    reachability : bool
+        If True, the heuristic of each state is computed with reachability_heuristic instead of being updated incrementally
+    reach : dictionary
+        Dictionary where the keys are the airport codes and the values are the sets of airports reachable from them
+        through any sequence of legs (including the airport itself)
+    deadlines : list of ints
+        For each leg id, the airplane must be ready to depart before this time to be able to fly the leg (None if no time works)
+    flyable : list of bools
+        For each leg id, whether some airplane can fly the leg at all, given the opening hours of the airports
 
     Methods
     -------
@@ -100,10 +185,22 @@ class ASARProblem(search.Problem):
         Calculates the cost of a solution path that arrives at state2 from state1 via action a.
         Assumes cost c to get up to state1
     heuristic(n, state=None)
-        Computes the heuristic of node n, which encapsulates a given state
+        Returns the heuristic of node n, which encapsulates a given state
+    reachability_heuristic(state)
+        Computes a tighter heuristic of state, which only counts the classes that can still fly each remaining leg
+    evaluation(n)
+        Returns the evaluation function f(n)=g(n)+h(n) of node n
     load(f)
-        Loads a problem from a (opened) file object f (the formatting is specified in the Mini-Project statement).
-        Gets the max profit of each leg. Initializes the initial state of this problem
+        Loads a problem from a (opened) file object f (the formatting is specified in the Mini-Project statement)
+    load_compiled(filename)
+        Loads a problem from a compiled file
+    build(A, C, P, L)
+        Builds the profit matrix, the max profit of each leg and the indexes used by actions.
+        Initializes the initial state of this problem
+    initialize()
+        Builds the data that depends on the airplanes and the initial state of this problem
+    presolve()
+        Detects some infeasible problems without searching and removes the airplanes that can never be used
     save(f)
         Saves a solution state s to a (opened) file object f (the formatting is specified in the Mini-Project statement).
     calculate_profit(s)
@@ -113,13 +210,32 @@ class ASARProblem(search.Problem):
     formatted_schedule(i, schedule)
         Makes a string which represents an airplane schedule, that will be written int the output file
         (with the formatting specified in the Mini-Project statement)
+    sort_twins(state, idx)
+        Sorts the schedules of the airplanes of the same class as airplane idx
     """
 
-    def __init__(self):
+    def __init__(self, symmetry=True, reachability=False):
+        """
+        Parameters
+        ----------
+        symmetry : bool, optional
+            Whether to break the symmetry between airplanes of the same class (default is True)
+        reachability : bool, optional
+            Whether to use the tighter reachability_heuristic (default is False)
+        """
         super().__init__(None)
+        self.symmetry = symmetry
+        self.twins = []
+        self.reachability = reachability
+        self.reach = {}
+        self.deadlines = self.flyable = []
         self.A = self.C = {}
         self.L = self.P = []
         self.maxprofitall = 0
+        self.class_index = {}
+        self.profits = self.plane_profits = self.plane_costs = []
+        self.departures = self.turnarounds = self.first_tods = {}
+        self.windows = []
 
     def actions(self, state):
         """Returns the actions that can be executed in the given
@@ -133,6 +249,7 @@ class ASARProblem(search.Problem):
             Plane can make more trips (current airport is not closed)
             If added leg is the last of the airplane, must match with the first airport
             Before assigning a leg to "empty" airplane, there must be at least two legs left to close the loop
+            If symmetry is enabled, only the first "empty" airplane of each class is given a leg
 
         Parameters
         ----------
@@ -143,33 +260,43 @@ class ASARProblem(search.Problem):
         -------
         tuple
             A tuple containing the index of the airplane to which the leg will
-            be added, the leg to be added and the new tod of the airplane
+            be added, the id of the leg to be added and the new tod of the airplane
         """
 
+        remaining = state.remaining
+        opened = set()      # Classes for which an empty airplane was already given a leg
+
         for idx, airplane_legs in enumerate(state.schedule):
             if not airplane_legs:
-                if len(state.remaining) == 1:      # One leg left and empty airplane, don't add
+                if not remaining & (remaining - 1):   # At most one leg left and empty airplane, don't add
                     continue
-                for next_leg in state.remaining:
-                    dep_time = self.A[next_leg['dep']]['start']
-                    new_tod = self.nextleg_dep_time(next_leg, idx, dep_time)
+                plane_class = self.P[idx]['class']
+                if self.symmetry:
+                    if plane_class in opened:     # Same as the empty airplane already opened
+                        continue
+                    opened.add(plane_class)
+                first_tods = self.first_tods[plane_class]
+                for leg_id in leg_ids(remaining):
+                    new_tod = first_tods[leg_id]
                     if new_tod == -1:             # Conflict regarding times, don't add
                         continue
-                    yield (idx, next_leg, new_tod)
+                    yield (idx, leg_id, new_tod)
             else:
-                if not state.tod[idx]:            # Empty string, schedule for this airplane is full
+                if state.tod[idx] is None:        # Schedule for this airplane is full
                     continue
-                for next_leg in state.remaining:
-                    if next_leg['dep'] != airplane_legs[-1]['arr']:
+                # Only the legs departing from the airport where the airplane is
+                for leg_id in self.departures[self.L[airplane_legs[-1]]['arr']]:
+                    if not remaining >> leg_id & 1:
                         continue
+                    next_leg = self.L[leg_id]
                     new_tod = self.nextleg_dep_time(next_leg, idx, state.tod[idx])
                     if new_tod == -1:             # Conflict regarding times, don't add
                         continue
                     if new_tod >= self.A[next_leg['arr']]['end']:  # Will be the plane's last airport
-                        if airplane_legs[0]['dep'] != next_leg['arr']: # Does not loop back, invalid node
+                        if self.L[airplane_legs[0]]['dep'] != next_leg['arr']: # Does not loop back, invalid node
                             continue
-                        new_tod = ''
-                    yield (idx, next_leg, new_tod)
+                        new_tod = None
+                    yield (idx, leg_id, new_tod)
 
     def result(self, state, action):
         """Computes the state that results from executing a given
@@ -186,20 +313,61 @@ class ASARProblem(search.Problem):
         new_state : object
         """
 
-        new_state = copy_deepcopy(state)
+        # Legs are never modified, so the new state only needs new tuples for what changed
+        new_state = copy_copy(state)
 
         idx_airplane = action[0]
-        new_leg = action[1]
+        new_leg_id = action[1]
         new_tod = action[2]
 
-        new_state.tod[idx_airplane] = new_tod
-        new_state.schedule[idx_airplane].append(new_leg)
-        new_state.remaining.remove(new_leg)
+        new_state.tod = state.tod[:idx_airplane] + (new_tod,) + state.tod[idx_airplane+1:]
+        new_state.schedule = (state.schedule[:idx_airplane]
+                              + (state.schedule[idx_airplane] + (new_leg_id,),)
+                              + state.schedule[idx_airplane+1:])
+        new_state.remaining = state.remaining & ~(1 << new_leg_id)
         new_state.g = self.path_cost(state.g, state, action, new_state)
-        new_state.h = self.heuristic(None, new_state)
+
+        if self.symmetry:
+            self.sort_twins(new_state, idx_airplane)
+
+        if self.reachability:
+            new_state.h = self.reachability_heuristic(new_state)
+        else:
+            # The heuristic only loses the term of the leg that was added
+            new_state.h = state.h - (self.maxprofitall - self.L[new_leg_id]['maxprofit'])
 
         return new_state
 
+    def sort_twins(self, state, idx):
+        """Sorts the schedules of the airplanes of the same class as airplane idx by the ids of their legs.
+        Airplanes of the same class are interchangeable, so this gives the same (canonical) state for every
+        permutation of their schedules
+
+        Parameters
+        ----------
+        state : object
+            State to sort, modified in place
+        idx : int
+            Index of the airplane whose schedule changed
+        """
+
+        twins = self.twins[idx]
+        if len(twins) < 2:
+            return
+
+        order = sorted(twins, key=lambda i: state.schedule[i])
+        if order == list(twins):
+            return
+
+        schedule = list(state.schedule)
+        tod = list(state.tod)
+        for i, j in zip(twins, order):
+            schedule[i] = state.schedule[j]
+            tod[i] = state.tod[j]
+
+        state.schedule = tuple(schedule)
+        state.tod = tuple(tod)
+
     def goal_test(self, state):
         """Checks if the state is a goal state
 
@@ -214,7 +382,7 @@ class ASARProblem(search.Problem):
             for plane in state.schedule:
                 if not plane:
                     continue
-                if plane[0]['dep'] != plane[-1]['arr']:
+                if self.L[plane[0]]['dep'] != self.L[plane[-1]]['arr']:
                     # Departure airport is not the same as the arrival
                     return False
             return True
@@ -225,7 +393,7 @@ class ASARProblem(search.Problem):
         """Calculates the cost of a solution path that arrives at state2 from
         state1 via action a, assuming cost c to get up to state1.
 
-        Receives a = (index of airplane, leg, ...) e.g. (3, {'dep': 'LPPT', 'arr': ...}, ...)
+        Receives a = (index of airplane, leg id, ...) e.g. (3, 5, ...)
         Goes to the list of airplanes in self and figures out the class of airplane
         With the class information goes to the leg to add and figures out the profit
         For clarity: self.P[a[0]] = {'airplane': 'CS-TUA', 'class': 'a320'}
@@ -240,10 +408,14 @@ class ASARProblem(search.Problem):
         -------
         float
         """
-        return c + self.maxprofitall - a[1][self.P[a[0]]['class']]
+        return c + self.plane_costs[a[0]][a[1]]
 
     def heuristic(self, n, state=None):
-        """Computes the heuristic of node n, which encapsulates a given state
+        """Returns the heuristic of node n, which encapsulates a given state
+
+        The heuristic is the sum of (maxprofitall - max profit) over the remaining legs.
+        It is computed for the initial state in load and then updated incrementally in result,
+        so here it is only read from the state
 
         Parameters
         ----------
@@ -259,25 +431,200 @@ class ASARProblem(search.Problem):
         else:
             curr_state = n.state
 
+        return curr_state.h
+
+    def reachability_heuristic(self, state):
+        """Computes a tighter heuristic of state, which only counts the classes that can still fly each remaining leg
+
+        A class can still fly a leg if it has an empty airplane and the leg fits in the opening hours of the airports,
+        or if it has an airplane whose schedule is not full, which can reach the departure airport of the leg
+        (through any sequence of legs) and which is ready before the leg's deadline.
+        Each remaining leg contributes (maxprofitall - max profit among those classes).
+        These conditions only get stricter as legs are added, and the class that flies a leg always satisfies them,
+        so the heuristic stays consistent. If no class can fly some remaining leg, no goal can be reached from the state
+
+        Parameters
+        ----------
+        state : object
+
+        Returns
+        -------
+        heurfun : float
+            Infinity if some remaining leg can no longer be flown
+        """
+
+        # For each class: whether it has an empty airplane, and the (airport, tod) of its airplanes that can still fly
+        empty = set()
+        positions = {}
+        for idx, airplane_legs in enumerate(state.schedule):
+            plane_class = self.P[idx]['class']
+            if not airplane_legs:
+                empty.add(plane_class)
+            elif state.tod[idx] is not None:
+                positions.setdefault(plane_class, []).append((self.L[airplane_legs[-1]]['arr'], state.tod[idx]))
+
         heurfun = 0
-        for leg in curr_state.remaining:
-            heurfun += self.maxprofitall - leg['maxprofit']
+        for leg_id in leg_ids(state.remaining):
+            if not self.flyable[leg_id]:
+                return inf
+            dep = self.L[leg_id]['dep']
+            deadline = self.deadlines[leg_id]
+            best = None
+            for plane_class, profit in zip(self.C, self.profits[leg_id]):
+                if best is not None and profit <= best:
+                    continue
+                if plane_class in empty or any(dep in self.reach[airport] and tod < deadline
+                                               for airport, tod in positions.get(plane_class, ())):
+                    best = profit
+            if best is None:
+                return inf
+            heurfun += self.maxprofitall - best
 
         return heurfun
 
+    def evaluation(self, n):
+        """Returns the evaluation function f(n)=g(n)+h(n) of node n, which is already stored in its state.
+        Can be given to search.astar_search as f, to avoid recomputing and caching it on the nodes
+
+        Parameters
+        ----------
+        n : object
+
+        Returns
+        -------
+        float
+        """
+        return n.state.g + n.state.h
+
     def load(self, f):
-        """Loads a problem from a (opened) file object f (the formatting is specified in the Mini-Project statement).
-        Gets the max profit of each leg. Initializes the initial state of this problem
+        """Loads a problem from a (opened) file object f (the formatting is specified in the Mini-Project statement)
 
         Parameters
         ----------
         f : file
         """
 
-        self.A, self.C, self.P, self.L = read_input_from_file(f)
-        self.L = get_maxprofits(self.L, self.C)
+        self.build(*read_input_from_file(f))
+
+    def load_compiled(self, filename):
+        """Loads a problem from a compiled file (see compiled.py), which is memory-mapped instead of parsed
+
+        Parameters
+        ----------
+        filename : string
+        """
+
+        self.build(*read_compiled_file(filename))
+
+    def build(self, A, C, P, L):
+        """Sets the input of the problem (as returned by read_input_from_file) and builds the profit matrix, from which
+        the max profit of each leg is taken. Builds the indexes used by actions: the legs departing from each airport, the departure window of each leg and,
+        per airplane class, the turnaround time and first tod of each leg.
+        Initializes the initial state of this problem
+
+        Parameters
+        ----------
+        A : dictionary
+        C : dictionary
+        P : list of dictionaries
+        L : list of dictionaries
+        """
+
+        self.A, self.C, self.P, self.L = A, C, P, L
+        self.class_index = {plane_class: i for i, plane_class in enumerate(self.C)}
+        self.profits = get_profits(self.L, self.C)
+        for leg, profits in zip(self.L, self.profits):
+            leg['maxprofit'] = max(profits)
         self.maxprofitall = max([leg['maxprofit'] for leg in self.L]) + 1
+
+        self.departures = {airport: [] for airport in self.A}
+        for leg in self.L:
+            self.departures.setdefault(leg['dep'], []).append(leg['id'])
+        self.windows = get_windows(self.L, self.A)
+        self.turnarounds = get_turnarounds(self.L, self.C)
+        self.first_tods = {}
+        for plane_class, turnarounds in self.turnarounds.items():
+            self.first_tods[plane_class] = [
+                departure_time(self.windows[leg['id']], self.A[leg['dep']]['start'], turnarounds[leg['id']])
+                for leg in self.L]
+
+        self.reach = get_reach(self.L, self.A)
+        self.deadlines = [get_deadline(window) for window in self.windows]
+        self.flyable = [deadline is not None and self.A[leg['dep']]['start'] < deadline
+                        for leg, deadline in zip(self.L, self.deadlines)]
+
+        self.initialize()
+
+    def initialize(self):
+        """Builds the data that depends on the airplanes (their twins, profits and costs) and the initial state of this
+        problem"""
+
+        self.twins = [tuple(i for i, other in enumerate(self.P) if other['class'] == plane['class']) for plane in self.P]
+
+        # The airplanes of the same class share their lists
+        class_profits = [[profits[i] for profits in self.profits] for i in range(len(self.C))]
+        class_costs = [[self.maxprofitall - profit for profit in profits] for profits in class_profits]
+        columns = [self.class_index.get(plane['class']) for plane in self.P]
+        self.plane_profits = [None if i is None else class_profits[i] for i in columns]
+        self.plane_costs = [None if i is None else class_costs[i] for i in columns]
+
         self.initial = state(len(self.P), self.L)
+        if self.reachability:
+            self.initial.h = self.reachability_heuristic(self.initial)
+        else:
+            self.initial.h = sum(self.maxprofitall - leg['maxprofit'] for leg in self.L)
+
+    def presolve(self):
+        """Checks conditions that every feasible problem satisfies, so that infeasible problems can be detected
+        without searching. If they all hold, removes the airplanes that can never be used.
+
+        Checks done:
+            Every leg fits in the opening hours of its departure and arrival airports
+            Every airport has as many legs arriving as departing, since each airplane flies a closed loop
+            Every leg has a profit for some class which has airplanes
+        Airplanes removed:
+            Airplanes of a class without rotation time (they can't fly any leg)
+            Airplanes beyond the maximum number that can be used, per class: each used airplane flies at least
+            two legs (unless some leg departs from and arrives at the same airport)
+
+        Returns
+        -------
+        bool
+            False if the problem is infeasible, or True if it may be feasible
+        """
+
+        if not all(self.flyable):
+            return False
+
+        balance = {}
+        for leg in self.L:
+            balance[leg['dep']] = balance.get(leg['dep'], 0) - 1
+            balance[leg['arr']] = balance.get(leg['arr'], 0) + 1
+        if any(balance.values()):
+            return False
+
+        fleet = {plane['class'] for plane in self.P if plane['class'] in self.C}
+        if any(fleet.isdisjoint(leg) for leg in self.L):
+            return False
+
+        if any(leg['dep'] == leg['arr'] for leg in self.L):
+            max_planes = len(self.L)
+        else:
+            max_planes = len(self.L) // 2
+
+        planes = []
+        count = {}
+        for plane in self.P:
+            if plane['class'] not in fleet or count.get(plane['class'], 0) >= max_planes:
+                continue
+            count[plane['class']] = count.get(plane['class'], 0) + 1
+            planes.append(plane)
+
+        if len(planes) < len(self.P):
+            self.P = planes
+            self.initialize()
+
+        return True
 
     def save(self, f, s):
         """Saves a solution state s to a (opened) file object f (the formatting is specified in the Mini-Project statement).
@@ -322,11 +669,9 @@ class ASARProblem(search.Problem):
 
         profit = 0
 
-        for i, plane_schedule in enumerate(s.schedule):
-            plane_class = self.P[i]['class']
-
-            for leg in plane_schedule:
-                profit += leg[plane_class]
+        for profits, plane_schedule in zip(self.plane_profits, s.schedule):
+            for leg_id in plane_schedule:
+                profit += profits[leg_id]
 
         return profit
 
@@ -338,44 +683,27 @@ class ASARProblem(search.Problem):
         ----------
         leg : dictionary
         idx : int
-        dep_time : tod of plane in the previous state
+        dep_time : tod of plane in the previous state (in minutes)
 
         Returns
         ----------
         -1 if the leg is incompatible with the opening/closing time of the airports
-        string otherwise
+        int otherwise (in minutes)
         """
-        airports = self.A
-        dep_closing_time = airports[leg['dep']]['end']
-        arr_opening_time = airports[leg['arr']]['start']
-        arr_closing_time = airports[leg['arr']]['end']
-        duration = leg['dl']
-
-        # Minimum time before departing and starting a new flight
-        delta_time = sum_time(duration, self.C[self.P[idx]['class']])
-
-        earliest_arr_time = sum_time(dep_time, duration)
-        earliest_dep_time = sum_time(arr_opening_time, duration, -1)
-
-        if earliest_arr_time < arr_opening_time:
-            if earliest_dep_time < dep_closing_time:
-                return sum_time(earliest_dep_time, delta_time)
-        elif earliest_arr_time < arr_closing_time:
-            return sum_time(dep_time, delta_time)
-
-        return -1      # Airport times are not compatible with leg
+        leg_id = leg['id']
+        return departure_time(self.windows[leg_id], dep_time, self.turnarounds[self.P[idx]['class']][leg_id])
 
     def formatted_schedule(self, i, schedule):
         """Makes a string which represents an airplane schedule, that will be written int the output file
         (with the formatting specified in the Mini-Project statement)
 
-        Receives an index - i - which corresponds to the selected airplane and a list of legs - schedule - with the associated legs.
+        Receives an index - i - which corresponds to the selected airplane and a tuple of leg ids - schedule - with the associated legs.
         Loops through each schedule and gets a formatted string accordingly to the requisites in the Mini-Project statement.
 
         Parameters
         ----------
         i : int
-        schedule : list of dictionaries
+        schedule : tuple of ints
 
         Returns
         -------
@@ -387,25 +715,51 @@ class ASARProblem(search.Problem):
         line += self.P[i]['airplane'] + ' '
 
         # First departure airport opening time
-        dep_time = self.A[schedule[0]['dep']]['start']
+        dep_time = self.A[self.L[schedule[0]]['dep']]['start']
         # Plane rotation time
         dr = self.C[self.P[i]['class']]
 
-        for leg in schedule:
+        for leg_id in schedule:
+            leg = self.L[leg_id]
             dep_time = self.nextleg_dep_time(leg, i, dep_time)
-            time = sum_time(dep_time, leg['dl'], -1)
-            time = sum_time(time, dr, -1)
+            time = dep_time - leg['dl'] - dr
 
-            line += time + ' '
+            line += minutes2hhmm(time) + ' '
             line += leg['dep'] + ' '
             line += leg['arr'] + ' '
 
         return line
 
 
+class InputError(ValueError):
+    """Raised when an input file is malformed
+
+    Attributes
+    ----------
+    filename : string
+        Name of the input file
+    line : int
+        Number of the line with the error (starting at 1), or None if the error is not in a line
+    message : string
+        Description of the error
+    """
+
+    def __init__(self, filename, line, message):
+        if line is None:
+            super().__init__("{}: {}".format(filename, message))
+        else:
+            super().__init__("{}:{}: {}".format(filename, line, message))
+        self.filename = filename
+        self.line = line
+        self.message = message
+
 def read_input_from_file(f):
     """From an open file f, reads each line and processes it, creating the problem input variables.
 
+    The file is read line by line and validated as it is read: the number of fields of each line, the time formats,
+    the profits and repeated airports, classes and airplanes. When the file ends, checks that every leg departs from
+    and arrives at known airports and has a profit for every class with a rotation time.
+
     Parameters
     ----------
     f : file
@@ -414,21 +768,31 @@ def read_input_from_file(f):
     Returns
     -------
     A : dictionary
-        Dictionary with airports, where the keys are the airport codes. The value is a dictionary with keys: 'start' and 'end' times
+        Dictionary with airports, where the keys are the airport codes. The value is a dictionary with keys: 'start' and 'end' times (in minutes)
     C : dictionary
-        Dictionary with planes classes, where the keys are the aircraft classes and the values are the rotation times
+        Dictionary with planes classes, where the keys are the aircraft classes and the values are the rotation times (in minutes)
     P : list of dictionaries
         List of dictionaries, where each dictionary is a plane. These dictionaries have as keys: airplane and class
     L : list of dictionaries
-        List of dictionaries, where each dictionary is a leg. These dictionaries have as keys: dep, arr, dl, and the aircraft classes
+        List of dictionaries, where each dictionary is a leg. These dictionaries have as keys: id, dep, arr, dl, and the aircraft classes.
+        The id is the index of the leg in L and the duration dl is in minutes
+
+    Raises
+    ------
+    InputError
+        If the file is malformed, with the file name and line of the first error found
     """
 
+    filename = getattr(f, 'name', '<input>')
     A = {}
     C = {}
     P = []
     L = []
+    planes = set()
+    plane_lines = []    # Line of each airplane and leg, to report the errors found when the file ends
+    leg_lines = []
 
-    for line in f.readlines():
+    for n, line in enumerate(f, 1):
         splitted = line.split()
         if not splitted:
             continue
@@ -436,78 +800,438 @@ def read_input_from_file(f):
         code = splitted[0]
         arg = splitted[1:]
 
-        if code == 'A':
-            d = {'start': arg[1], 'end': arg[2]}
-            A[arg[0]] = d
+        try:
+            if code == 'A':
+                check_fields(arg, 3, "A <airport> <opening time> <closing time>")
+                if arg[0] in A:
+                    raise ValueError("airport {} is repeated".format(arg[0]))
+                d = {'start': parse_time(arg[1]), 'end': parse_time(arg[2])}
+                if d['end'] < d['start']:
+                    raise ValueError("airport {} closes before it opens".format(arg[0]))
+                A[arg[0]] = d
+
+            elif code == 'C':
+                check_fields(arg, 2, "C <class> <rotation time>")
+                if arg[0] in C:
+                    raise ValueError("class {} is repeated".format(arg[0]))
+                C[arg[0]] = parse_time(arg[1], duration=True)
+
+            elif code == 'P':
+                check_fields(arg, 2, "P <airplane> <class>")
+                if arg[0] in planes:
+                    raise ValueError("airplane {} is repeated".format(arg[0]))
+                planes.add(arg[0])
+                d = {"airplane": arg[0], "class": arg[1]}
+                P.append(d)
+                plane_lines.append(n)
+
+            elif code == 'L':
+                if len(arg) < 5 or len(arg) % 2 == 0:
+                    raise ValueError("expected L <departure> <arrival> <duration> <class> <profit> [<class> <profit>...]")
+                d = {"id": len(L), "dep": arg[0], "arr": arg[1], "dl": parse_time(arg[2], duration=True)}
+                for i in range(3, len(arg), 2):
+                    if arg[i] in d:
+                        raise ValueError("class {} is repeated".format(arg[i]))
+                    d[arg[i]] = parse_profit(arg[i+1])
+                L.append(d)
+                leg_lines.append(n)
+
+            else:
+                raise ValueError("unknown line type {!r} (expected A, C, P or L)".format(code))
+
+        except ValueError as e:
+            raise InputError(filename, n, str(e)) from None
+
+    if not L:
+        raise InputError(filename, None, "there are no legs (L lines)")
+    for plane, n in zip(P, plane_lines):
+        if plane['class'] not in C:
+            raise InputError(filename, n, "class {} has no rotation time (C line)".format(plane['class']))
+    for leg, n in zip(L, leg_lines):
+        for airport in (leg['dep'], leg['arr']):
+            if airport not in A:
+                raise InputError(filename, n, "unknown airport {}".format(airport))
+        for plane_class in C:
+            if plane_class not in leg:
+                raise InputError(filename, n, "no profit for class {}".format(plane_class))
+
+    return A, C, P, L
+
+def check_fields(arg, n, usage):
+    """Raises a ValueError if a line does not have the expected number of fields
+
+    Parameters
+    ----------
+    arg : list of strings
+        Fields of the line, without the line type
+    n : int
+        Expected number of fields
+    usage : string
+        Expected format of the line
+    """
+
+    if len(arg) != n:
+        raise ValueError("expected " + usage)
+
+def parse_time(string, duration=False):
+    """Converts a time string with format hhmm to minutes, checking its format
+
+    Parameters
+    ----------
+    string : string
+    duration : bool
+        Whether it is a duration (which can have any number of hours) or a time of the day (up to 2400)
+
+    Returns
+    -------
+    int
 
-        elif code == 'C':
-            C[arg[0]] = arg[1]
+    Raises
+    ------
+    ValueError
+        If the string is not a valid time
+    """
 
-        elif code == 'P':
-            d = {"airplane": arg[0], "class": arg[1]}
-            P.append(d)
+    if len(string) != 4 or not string.isdigit() or int(string[2:]) >= 60:
+        raise ValueError("invalid time {!r} (expected hhmm)".format(string))
+    minutes = hhmm2minutes(string)
+    if not duration and minutes > 24 * 60:
+        raise ValueError("invalid time {!r} (after 2400)".format(string))
+    return minutes
 
-        elif code == 'L':
-            d = {"dep": arg[0], "arr": arg[1], "dl": arg[2]}
-            d.update({ arg[i]: float(arg[i+1]) for i in range(3, len(arg), 2) })
-            L.append(d)
+def parse_profit(string):
+    """Converts a profit string to a float, checking its format
 
+    Parameters
+    ----------
+    string : string
+
+    Returns
+    -------
+    float
+
+    Raises
+    ------
+    ValueError
+        If the string is not a number
+    """
+
+    try:
+        profit = float(string)
+    except ValueError:
+        raise ValueError("invalid profit {!r}".format(string)) from None
+    if profit != profit or profit in (inf, -inf):
+        raise ValueError("invalid profit {!r}".format(string))
+    return profit
+
+def read_compiled_file(filename):
+    """Reads a compiled input file (the format is described in compiled.py), memory-mapping it instead of parsing it.
+    The numbers are read straight from the mapping, without copying its sections
+
+    Parameters
+    ----------
+    filename : string
+
+    Returns
+    -------
+    A, C, P, L
+        As returned by read_input_from_file
+
+    Raises
+    ------
+    InputError
+        If the file is not a compiled file of this version, or is truncated
+    """
+
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < COMPILED_HEADER.size:
+            raise InputError(filename, None, "not a compiled ASAR file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, nairports, nclasses, nplanes, nlegs, names_size = COMPILED_HEADER.unpack_from(data)
+            if magic != COMPILED_MAGIC:
+                raise InputError(filename, None, "not a compiled ASAR file")
+            if version != COMPILED_VERSION:
+                raise InputError(filename, None, "unsupported version {} (expected {})".format(version,
+                                                                                            COMPILED_VERSION))
+
+            # Sections are padded to multiples of 8 bytes
+            offset = COMPILED_HEADER.size
+            names = data[offset:offset + names_size].decode('utf-8').split('\0')[:-1]
+            offset += names_size + -names_size % 8
+            if len(names) != nairports + nclasses + nplanes:
+                raise InputError(filename, None, "the names section is corrupted")
+            if not nlegs:
+                raise InputError(filename, None, "there are no legs")
+
+            sizes = [2 * nairports, nclasses, nplanes, 3 * nlegs]
+            end = offset + 4 * sum(sizes)
+            profits_offset = end + -end % 8
+            if len(data) != profits_offset + 8 * nlegs * nclasses:
+                raise InputError(filename, None, "the file is truncated or corrupted")
+
+            with memoryview(data) as view:
+                sections = []
+                for size in sizes:
+                    sections.append(read_numbers(view, offset, 'i', size))
+                    offset += 4 * size
+                profits = read_numbers(view, profits_offset, 'd', nlegs * nclasses)
+
+    airport_names, names = names[:nairports], names[nairports:]
+    class_names, plane_names = names[:nclasses], names[nclasses:]
+    airports, classes, planes, legs = sections
+
+    # The same checks as read_input_from_file, so that a corrupted file is reported instead of failing later
+    for i, name in enumerate(airport_names):
+        if not 0 <= airports[2*i] <= airports[2*i + 1] <= 24 * 60:
+            raise InputError(filename, None, "airport {} has invalid opening hours".format(name))
+    if any(rotation < 0 and rotation != NO_ROTATION for rotation in classes):
+        raise InputError(filename, None, "a rotation time is negative")
+    if any(not 0 <= class_id < nclasses for class_id in planes):
+        raise InputError(filename, None, "an airplane has an invalid class id")
+    for i in range(nlegs):
+        if not (0 <= legs[3*i] < nairports and 0 <= legs[3*i + 1] < nairports):
+            raise InputError(filename, None, "leg {} has an invalid airport id".format(i))
+        if legs[3*i + 2] < 0:
+            raise InputError(filename, None, "leg {} has a negative duration".format(i))
+        for class_id, rotation in enumerate(classes):
+            if rotation != NO_ROTATION and profits[i*nclasses + class_id] != profits[i*nclasses + class_id]:
+                raise InputError(filename, None, "leg {} has no profit for class {}".format(i, class_names[class_id]))
+
+    A = {name: {'start': airports[2*i], 'end': airports[2*i + 1]} for i, name in enumerate(airport_names)}
+    C = {name: rotation for name, rotation in zip(class_names, classes) if rotation != NO_ROTATION}
+    P = [{"airplane": name, "class": class_names[class_id]} for name, class_id in zip(plane_names, planes)]
+    for plane in P:
+        if plane['class'] not in C:
+            raise InputError(filename, None, "class {} of airplane {} has no rotation time".format(plane['class'],
+                                                                                                 plane['airplane']))
+    L = []
+    for i in range(nlegs):
+        leg = {"id": i, "dep": airport_names[legs[3*i]], "arr": airport_names[legs[3*i + 1]], "dl": legs[3*i + 2]}
+        row = profits[i*nclasses:(i + 1)*nclasses]
+        leg.update((name, profit) for name, profit in zip(class_names, row) if profit == profit)    # Skips NaN
+        L.append(leg)
     return A, C, P, L
 
-def sum_time(t1, t2, sign=1):
-    """Computes the sum or the difference between two time strings, depending on a flag
+def read_numbers(view, offset, typecode, n):
+    """Reads n little-endian numbers from a memory view of a file
 
     Parameters
     ----------
-    t1, t2 : string
-    sign : int
+    view : memoryview
+    offset : int
+        Position of the first number, in bytes
+    typecode : string
+        'i' (int32) or 'd' (float64)
+    n : int
 
     Returns
+    -------
+    list
+    """
+
+    size = n * struct.calcsize(typecode)
+    with view[offset:offset + size] as section:
+        if sys.byteorder != 'little':
+            numbers = array.array(typecode)
+            numbers.frombytes(section)
+            numbers.byteswap()
+            return numbers.tolist()
+        with section.cast(typecode) as numbers:
+            return numbers.tolist()
+
+def get_windows(legs, airports):
+    """Computes the departure window of each leg, given the opening and closing times of the airports
+
+    Parameters
     ----------
-    string with added zeros if necessary, format hhmm
+    legs : list of dictionaries
+        List of dictionaries, where each dictionary represents a leg
+    airports : dictionary
+        Dictionary with airports, where the keys are the airport codes
+
+    Returns
+    -------
+    windows : list of tuples
+        List indexed by leg id. Each tuple has:
+            the earliest departure time for which the airplane arrives after the arrival airport opens,
+            whether the airplane can wait for that time (it is before the departure airport closes),
+            the latest departure time (exclusive) for which the airplane arrives before the arrival airport closes
     """
-    if sign>0:
-        sumtime = [int(t1[i:i+2]) + int(t2[i:i+2]) for i in range(0,len(t1),2)]
-        if sumtime[1] >= 60: # More than 60 minutes
-            sumtime[0] += 1
-            sumtime[1] -= 60
-    else:
-        sumtime = [int(t1[i:i+2]) - int(t2[i:i+2]) for i in range(0,len(t1),2)]
-        if sumtime[1] < 0: # More than 0 minutes
-            sumtime[0] -= 1
-            sumtime[1] += 60
 
-    return "{:02d}{:02d}".format(sumtime[0], sumtime[1])
+    windows = []
+    for leg in legs:
+        earliest_dep_time = airports[leg['arr']]['start'] - leg['dl']
+        can_wait = earliest_dep_time < airports[leg['dep']]['end']
+        latest_dep_time = airports[leg['arr']]['end'] - leg['dl']
+        windows.append((earliest_dep_time, can_wait, latest_dep_time))
 
-def get_maxprofits(legs, classes):
-    """Loops through each leg and gets the maximum profit of that leg
+    return windows
 
-    The max profit is added as key to the legs dictionary
+def get_deadline(window):
+    """Computes the time before which an airplane must be ready to depart to be able to fly a leg
+
+    Parameters
+    ----------
+    window : tuple
+        Departure window of the leg (see get_windows)
+
+    Returns
+    -------
+    int or None
+        None if the leg can't be flown at any time
+    """
+    earliest_dep_time, can_wait, latest_dep_time = window
+
+    if earliest_dep_time < latest_dep_time:
+        return latest_dep_time
+    elif can_wait:
+        return earliest_dep_time
+    return None
+
+def get_reach(legs, airports):
+    """Computes the airports reachable from each airport through any sequence of legs
 
     Parameters
     ----------
     legs : list of dictionaries
         List of dictionaries, where each dictionary represents a leg
-    classes : dictionary
-        Dictionary that will contain the existing airplane classes
+    airports : dictionary
+        Dictionary with airports, where the keys are the airport codes
 
     Returns
     -------
+    reach : dictionary
+        Dictionary where the keys are the airport codes and the values are frozensets of airport codes (including itself)
+    """
+
+    neighbours = {airport: set() for airport in airports}
+    for leg in legs:
+        neighbours.setdefault(leg['dep'], set()).add(leg['arr'])
+        neighbours.setdefault(leg['arr'], set())
+
+    reach = {}
+    for airport in neighbours:
+        visited = {airport}
+        stack = [airport]
+        while stack:
+            for neighbour in neighbours[stack.pop()]:
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    stack.append(neighbour)
+        reach[airport] = frozenset(visited)
+
+    return reach
+
+def get_turnarounds(legs, classes):
+    """Computes, for each airplane class, the duration of each leg plus the rotation time of the class
+
+    Parameters
+    ----------
     legs : list of dictionaries
-        Same list as input, but each leg now has a key named maxprofit with the corresponding max profit
+        List of dictionaries, where each dictionary represents a leg
+    classes : dictionary
+        Dictionary with planes classes, where the keys are the aircraft classes and the values are the rotation times
+
+    Returns
+    -------
+    turnarounds : dictionary
+        Dictionary where the keys are the aircraft classes and the values are lists indexed by leg id
     """
 
-    if legs:
-        classes = list(classes.keys())
+    return {plane_class: [leg['dl'] + rotation for leg in legs] for plane_class, rotation in classes.items()}
 
-        for leg in legs:
-            profits = [leg[c] for c in classes]
-            leg['maxprofit'] = max(profits)
+def departure_time(window, dep_time, turnaround):
+    """Computes the time at which an airplane can start a new flight after flying a leg
+
+    Parameters
+    ----------
+    window : tuple
+        Departure window of the leg (see get_windows)
+    dep_time : int
+        Time at which the airplane is ready to depart (in minutes)
+    turnaround : int
+        Duration of the leg plus the rotation time of the airplane (in minutes)
+
+    Returns
+    ----------
+    -1 if the leg is incompatible with the opening/closing time of the airports
+    int otherwise (in minutes)
+    """
+    earliest_dep_time, can_wait, latest_dep_time = window
+
+    if dep_time < earliest_dep_time:
+        if can_wait:
+            return earliest_dep_time + turnaround
+    elif dep_time < latest_dep_time:
+        return dep_time + turnaround
+
+    return -1      # Airport times are not compatible with leg
+
+def leg_ids(bitmask):
+    """Yields the ids of the legs in a bitmask, in increasing order
+
+    Parameters
+    ----------
+    bitmask : int
+        Bit i is set if the leg with id i is in the set
+
+    Yields
+    ----------
+    int
+    """
+    while bitmask:
+        lowest = bitmask & -bitmask
+        yield lowest.bit_length() - 1
+        bitmask ^= lowest
+
+def hhmm2minutes(string):
+    """Converts a time string with format hhmm to the number of minutes since midnight
+
+    Parameters
+    ----------
+    string : string
 
-    return legs
+    Returns
+    ----------
+    int
+    """
+    return int(string[:2]) * 60 + int(string[2:4])
+
+def minutes2hhmm(minutes):
+    """Converts a number of minutes since midnight to a time string with format hhmm
+
+    Parameters
+    ----------
+    minutes : int
+
+    Returns
+    ----------
+    string with added zeros if necessary, format hhmm
+    """
+    return "{:02d}{:02d}".format(*divmod(minutes, 60))
+
+def get_profits(legs, classes):
+    """Builds the profit matrix of the legs
+
+    Parameters
+    ----------
+    legs : list of dictionaries
+        List of dictionaries, where each dictionary represents a leg
+    classes : dictionary
+        Dictionary that will contain the existing airplane classes
+
+    Returns
+    -------
+    profits : list of lists
+        For each leg (in the order of legs), the list of its profits for each class (in the order of classes)
+    """
+
+    classes = list(classes)
+    return [[leg[c] for c in classes] for leg in legs]
 
 def get_out_filename(in_filename):
     """Receives a filename and returns the string "output/filename". Works in every operating system
+    Compiled input files get the .txt extension
 
     Parameters:
     -----------
@@ -521,6 +1245,8 @@ def get_out_filename(in_filename):
     """
 
     out_filename = os.path.basename(in_filename)
+    if out_filename.endswith(COMPILED_EXTENSION):
+        out_filename = out_filename[:-len(COMPILED_EXTENSION)] + '.txt'
     out_filename = os.path.join('output', out_filename)
     return out_filename
 
@@ -534,45 +1260,403 @@ def str2bool(string):
     return string.lower() in ("yes", "y", "true", "t", "1")
 
 
+# Compiled input files (see compiled.py), which are loaded instead of parsed
+COMPILED_EXTENSION = '.asarb'
+COMPILED_MAGIC = b'ASAR'
+COMPILED_VERSION = 1
+COMPILED_HEADER = struct.Struct('<4sHxxIIIII')
+NO_ROTATION = -1    # Rotation time of the classes without one (only named by airplanes or legs)
+
+# Search engines that can be chosen from the command line.
+# All of them are called as engine(problem, display=..., f=...) and return the goal node or None
+ENGINES = {
+    'astar': search.astar_search,
+    'idastar': search.iterative_deepening_astar_search,
+    'anytime': search.anytime_weighted_astar_search,
+    'hda': search.hash_distributed_astar_search,
+    'dfbnb': search.depth_first_branch_and_bound_search,
+}
+
+# States remembered by the dfbnb engine by default (see search.depth_first_branch_and_bound_search)
+TRANSPOSITIONS = 1000000
+
+def parse_args(args):
+    """Parses the command line arguments
+
+    Parameters:
+    -----------
+    args : list of strings
+
+    Returns:
+    --------
+    argparse.Namespace
+    """
+
+    parser = argparse.ArgumentParser(description="Solves an Airline Scheduling and Routing problem")
+    parser.add_argument('input', help="input file name, as text or compiled (" + COMPILED_EXTENSION + "), "
+                                      "or a directory or glob pattern with --batch")
+    parser.add_argument('statistics', nargs='?', type=str2bool, default=False,
+                        help="boolean to print the search statistics")
+    parser.add_argument('--batch', action='store_true',
+                        help="solve every input file of a directory or glob pattern and print a summary")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="with --batch, number of processes solving instances in parallel (0 for one per core)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="with --batch, seconds after which an instance is abandoned")
+    parser.add_argument('--as-completed', action='store_true',
+                        help="with --batch, print each instance as soon as it is solved instead of in input order")
+    parser.add_argument('--reachability', action='store_true',
+                        help="use the tighter (and more expensive) reachability heuristic")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='astar',
+                        help="search algorithm: A*, the memory-bounded IDA*, the anytime weighted A*, the parallel "
+                             "hash distributed A* or depth-first branch and bound (default is astar)")
+    parser.add_argument('--search-workers', type=int, default=None,
+                        help="with the hda engine, number of worker processes (default is one per core)")
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="with the anytime and dfbnb engines, seconds after which the best schedule found so far "
+                             "is saved")
+    parser.add_argument('--greedy', type=int, default=0,
+                        help="with the dfbnb engine, nodes that the greedy search for an initial schedule may expand "
+                             "(default is 0, no greedy search)")
+    parser.add_argument('--transpositions', type=int, default=TRANSPOSITIONS,
+                        help="with the dfbnb engine, states remembered to prune those reached again (0 keeps the memory "
+                             "linear in the number of legs, default is {})".format(TRANSPOSITIONS))
+    parser.add_argument('--stats', action='store_true',
+                        help="with the astar engine, save the search statistics (node counts, frontier peak, time per "
+                             "operation, effective branching factor) as JSON in output/<input name>.stats.json")
+    parser.add_argument('--progress', type=float, default=None, metavar='SECONDS',
+                        help="with the astar engine, print the node counts every this many seconds during the search")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile the search with cProfile, saving the profile in output/<input name>.prof")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="with the astar engine, stop the search after this many seconds")
+    parser.add_argument('--max-expanded', type=int, default=None,
+                        help="with the astar engine, stop the search after expanding this many nodes")
+    parser.add_argument('--max-frontier', type=int, default=None,
+                        help="with the astar engine, stop the search when the frontier has more nodes than this")
+    parser.add_argument('--max-rss', type=float, default=None,
+                        help="with the astar engine, stop the search when the process uses more memory than this (MiB)")
+    return parser.parse_args(args)
+
+def solve_file(in_filename, args):
+    """Loads an input file, solves it with the search engine chosen in args and saves the result in the output folder
+
+    Parameters:
+    -----------
+    in_filename : string
+    args : argparse.Namespace
+        As returned by parse_args
+
+    Returns:
+    --------
+    dictionary
+        With keys: file, time (seconds, load and search), expanded (number of expanded nodes) and
+        profit (a number, "Infeasible", or the reason why the search was stopped)
+    """
+
+    start = time()
+    p = ASARProblem(reachability=args.reachability)
+    if in_filename.endswith(COMPILED_EXTENSION):
+        p.load_compiled(in_filename)
+    else:
+        with open(in_filename, 'r') as f:
+            p.load(f)
+
+    kwargs = {}
+    if args.engine == 'anytime':
+        kwargs['max_seconds'] = args.deadline
+        if args.statistics:
+            kwargs['callback'] = lambda node, bound: print("Profit {0:.1f}, suboptimality bound {1:.3f}".format(
+                p.calculate_profit(node.state), bound))
+    if args.engine == 'dfbnb':
+        kwargs.update(max_seconds=args.deadline, greedy=args.greedy, transpositions=args.transpositions)
+        if args.statistics:
+            kwargs['callback'] = lambda node: print("Profit {0:.1f}".format(p.calculate_profit(node.state)))
+    limits = (args.max_seconds, args.max_expanded, args.max_frontier, args.max_rss)
+    if args.engine == 'astar' and any(limit is not None for limit in limits):
+        kwargs['limits'] = search.SearchLimits(*limits)
+    if args.engine == 'hda':
+        kwargs['workers'] = args.search_workers
+    search_stats = None
+    if args.engine == 'astar' and (args.stats or args.progress is not None):
+        search_stats = search.SearchStats(timers=args.stats, interval=args.progress or 0,
+                                          callback=None if args.progress is None else print_progress)
+        kwargs['stats'] = search_stats
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    # Counts the expanded nodes whatever the engine
+    problem = search.InstrumentedProblem(p)
+    if p.presolve():
+        if profiler is not None:
+            profiler.enable()
+        sol = ENGINES[args.engine](problem, display=args.statistics, f=p.evaluation, **kwargs)
+        if profiler is not None:
+            profiler.disable()
+    else:
+        sol = None
+
+    out_filename = get_out_filename(in_filename)
+    # The hda engine expands the nodes in other processes, where they cannot be counted
+    stats = {'file': in_filename, 'expanded': None if args.engine == 'hda' else problem.succs}
+    if isinstance(sol, search.SearchResult) and sol.status == search.SearchResult.LIMIT:
+        print("Search stopped ({}) after expanding {} nodes, no schedule was saved".format(sol.reason, sol.expanded))
+        # An output file of an earlier run would otherwise look like the result of this one
+        if os.path.exists(out_filename):
+            os.remove(out_filename)
+        stats.update(time=time()-start, profit="Stopped ({})".format(sol.reason))
+    else:
+        if isinstance(sol, search.SearchResult):
+            sol = sol.node
+        with open(out_filename, 'w') as f:
+            if sol is None:
+                p.save(f, None)
+            else:
+                p.save(f, sol.state)
+        stats.update(time=time()-start, profit="Infeasible" if sol is None else p.calculate_profit(sol.state))
+
+    # Saved after the schedule, so that the schedule is not lost if saving them fails
+    if profiler is not None:
+        profiler.dump_stats(os.path.splitext(out_filename)[0] + '.prof')
+    if args.stats and search_stats is not None:
+        with open(os.path.splitext(out_filename)[0] + '.stats.json', 'w') as f:
+            json.dump(dict(file=in_filename, engine=args.engine, **search_stats.as_dict()), f, indent=4)
+
+    return stats
+
+def print_progress(stats):
+    """Prints the progress of a search (used as the callback of search.SearchStats)
+
+    Parameters:
+    -----------
+    stats : search.SearchStats
+    """
+
+    print("{:.1f} s: {} nodes expanded, {} generated, frontier peak {}".format(
+        stats.time, stats.expanded, stats.generated, stats.frontier_peak))
+
+def get_in_filenames(pattern):
+    """Returns the sorted input files of a directory (every .txt file in it) or matching a glob pattern
+
+    Parameters:
+    -----------
+    pattern : string
+        Directory or glob pattern
+
+    Returns:
+    --------
+    list of strings
+    """
+
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.txt')
+    return sorted(glob.glob(pattern))
+
+def solve_task(in_filename, args):
+    """Runs solve_file as one task of a batch: stops it after args.timeout seconds and turns any error into a result,
+    so that one pathological instance does not stall or break the batch
+
+    The time limit uses SIGALRM and so is only enforced on Unix
+
+    Parameters:
+    -----------
+    in_filename : string
+    args : argparse.Namespace
+        As returned by parse_args
+
+    Returns:
+    --------
+    dictionary
+        As returned by solve_file. On a timeout or an error, expanded is None and profit describes what happened
+    """
+
+    def alarm(signum, frame):
+        raise TimeoutError
+
+    timer = args.timeout is not None and hasattr(signal, 'SIGALRM')
+    if timer:
+        signal.signal(signal.SIGALRM, alarm)
+        signal.setitimer(signal.ITIMER_REAL, args.timeout)
+
+    start = time()
+    try:
+        return solve_file(in_filename, args)
+    except TimeoutError:
+        profit = "Timeout"
+    except Exception as e:
+        profit = "Error ({}: {})".format(type(e).__name__, e)
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return {'file': in_filename, 'time': time()-start, 'expanded': None, 'profit': profit}
+
+def solve_in_process(in_filename, args, conn):
+    """Target of the processes started by solve_parallel: sends the result of solve_task through conn
+
+    Parameters:
+    -----------
+    in_filename : string
+    args : argparse.Namespace
+        As returned by parse_args
+    conn : multiprocessing.connection.Connection
+    """
+
+    conn.send(solve_task(in_filename, args))
+    conn.close()
+
+def solve_parallel(in_filenames, args):
+    """Solves the input files in up to args.workers processes at a time, a new process for each input file, so that
+    a process that dies (e.g. killed for running out of memory) only fails its own input file. Processes still
+    running one second after args.timeout are terminated, also where SIGALRM is not available
+
+    Parameters:
+    -----------
+    in_filenames : list of strings
+    args : argparse.Namespace
+        As returned by parse_args
+
+    Yields:
+    -------
+    dictionary
+        The result of each input file (see solve_task), in the order of in_filenames or, with args.as_completed,
+        as soon as each one is solved
+    """
+
+    # Only imported here, as it takes longer to import than most instances take to solve
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    workers = args.workers or multiprocessing.cpu_count()
+
+    pending = list(enumerate(in_filenames))
+    running = {}        # Receiving end of the pipe of each process: index, input file, process and start time
+    results = {}        # Results not yielded yet, by index
+    next_index = 0      # Index of the next result to yield in input order
+
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                index, in_filename = pending.pop(0)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=solve_in_process, args=(in_filename, args, sender))
+                process.start()
+                sender.close()
+                running[receiver] = (index, in_filename, process, time())
+
+            for receiver in wait(list(running), timeout=0.1):
+                index, in_filename, process, start = running.pop(receiver)
+                try:
+                    results[index] = receiver.recv()
+                except EOFError:
+                    # The process died without sending its result
+                    process.join()
+                    results[index] = {'file': in_filename, 'time': time()-start, 'expanded': None,
+                                      'profit': "Failed (exit code {})".format(process.exitcode)}
+                receiver.close()
+                process.join()
+
+            if args.timeout is not None:
+                for receiver, (index, in_filename, process, start) in list(running.items()):
+                    if time() - start > args.timeout + 1:
+                        process.terminate()
+                        process.join()
+                        receiver.close()
+                        del running[receiver]
+                        results[index] = {'file': in_filename, 'time': time()-start, 'expanded': None,
+                                          'profit': "Timeout"}
+
+            if args.as_completed:
+                for index in sorted(results):
+                    yield results.pop(index)
+            else:
+                while next_index in results:
+                    yield results.pop(next_index)
+                    next_index += 1
+    finally:
+        for receiver, (_, _, process, _) in running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+
+def batch(args):
+    """Solves every input file of a directory or glob pattern, in this process or in up to args.workers processes at a time
+
+    Saves each result in the output folder and prints a summary table with the time, the number of expanded nodes
+    and the profit of each instance. With args.as_completed, each row is also printed as soon as it is available
+
+    Parameters:
+    -----------
+    args : argparse.Namespace
+        As returned by parse_args, where input is a directory or glob pattern
+    """
+
+    in_filenames = get_in_filenames(args.input)
+    if not in_filenames:
+        print("No input files match {}".format(args.input))
+        return
+
+    if args.workers == 1:
+        results = (solve_task(in_filename, args) for in_filename in in_filenames)
+    else:
+        results = solve_parallel(in_filenames, args)
+
+    table = []
+    for stats in results:
+        row = [stats['file'],
+               "-" if stats['time'] is None else "{:.3f}".format(stats['time']),
+               "-" if stats['expanded'] is None else stats['expanded'],
+               stats['profit']]
+        table.append(row)
+        if args.as_completed:
+            print_table([row])
+
+    print_table(table, header=["Instance", "Time (s)", "Expanded", "Profit"])
+
 def main(args):
     """ Main function
 
-    Initializes the problem and solves it with A* search. Saves the result in a file inside output folder
+    Initializes the problem, checks whether it is trivially infeasible and otherwise solves it with the chosen
+    search engine (A* by default).
+    Saves the result in a file inside output folder.
+    With --batch, does the same for every input file of a directory or glob pattern and prints a summary.
 
     Parameters:
     -----------
     args : list of strings
-        The first element of args corresponds to the input file name.
+        The first element of args corresponds to the input file name (or directory or glob pattern, with --batch).
         The second element is a boolean to print the search statistics.
+        The options are described in parse_args.
     """
 
     if(len(args)<1):
         print("No input filename was given. Returned")
         return
 
-    p = ASARProblem()
-
-    in_filename = args[0]
-    with open(in_filename, 'r') as f:
-        p.load(f)
-
-    if(len(args)>1):
-        display = str2bool(args[1])
-        sol = search.astar_search(p, p.heuristic, display)
+    args = parse_args(args)
+    if args.batch:
+        batch(args)
     else:
-        sol = search.astar_search(p, p.heuristic)
-
-    out_filename = get_out_filename(in_filename)
-    with open(out_filename, 'w') as f:
-        if sol is None:
-            p.save(f, None)
-        else:
-            p.save(f, sol.state)
+        try:
+            solve_file(args.input, args)
+        except InputError as e:
+            print(e)
 
 if __name__ == '__main__':
     from sys import argv
     if len(argv)==1:
         print(argv[0]+" <input file>")
         print(argv[0]+" <input file> <bool statistics>")
+        print(argv[0]+" <input file> <bool statistics> [--reachability] [--engine {astar,idastar,anytime,hda,dfbnb}] [--deadline seconds]")
+        print(argv[0]+" <input file> <bool statistics> --engine dfbnb [--greedy n] [--transpositions n]")
+        print(argv[0]+" <input file> <bool statistics> [--max-seconds s] [--max-expanded n] [--max-frontier n] [--max-rss MiB]")
+        print(argv[0]+" <input file> <bool statistics> [--stats] [--progress seconds] [--profile]")
+        print(argv[0]+" <directory or glob> --batch [--workers n] [--timeout seconds] [--as-completed] [options]")
     else:
         main(argv[1:])
@@ -9,11 +9,10 @@ import os.path
 import random
 import math
 import functools
-from statistics import mean
-
-import numpy as np
 from itertools import chain, combinations
 
+# statistics and numpy are slow to import and only needed by a few functions, which import them when called
+
 inf = float('inf')
 
 
@@ -285,10 +284,12 @@ def rms_error(X, Y):
 
 
 def ms_error(X, Y):
+    from statistics import mean
     return mean((x - y) ** 2 for x, y in zip(X, Y))
 
 
 def mean_error(X, Y):
+    from statistics import mean
     return mean(abs(x - y) for x, y in zip(X, Y))
 
 
@@ -297,6 +298,7 @@ def manhattan_distance(X, Y):
 
 
 def mean_boolean_error(X, Y):
+    from statistics import mean
     return mean(x != y for x, y in zip(X, Y))
 
 
@@ -355,6 +357,7 @@ def elu_derivative(value, alpha=0.01):
 
 
 def tanh(x):
+    import numpy as np
     return np.tanh(x)
 
 
@@ -893,6 +896,65 @@ class PriorityQueue:
         heapq.heapify(self.heap)
 
 
+class IndexedPriorityQueue(PriorityQueue):
+    """A PriorityQueue that also keeps a dictionary from each item to its heap
+    entry, so membership, lookup and deletion take O(1) time instead of a scan
+    of the heap. Deleted entries are only marked as removed and are discarded
+    when they reach the top of the heap (lazy deletion). Items must be hashable
+    and equal items are treated as the same key, so appending an item that is
+    already queued replaces it (which is how a decrease-key is done)."""
+
+    def __init__(self, order='min', f=lambda x: x):
+        super().__init__(order, f)
+        self.entries = {}
+
+    def append(self, item):
+        """Insert item at its correct position, replacing an equal item."""
+        if item in self.entries:
+            del self[item]
+        entry = [self.f(item), item, True]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        """Pop and return the item (with min or max f(x) value)
+        depending on the order."""
+        while self.heap:
+            value, item, valid = heapq.heappop(self.heap)
+            if valid:
+                del self.entries[item]
+                return item
+        raise Exception('Trying to pop from empty PriorityQueue.')
+
+    def __len__(self):
+        """Return current capacity of PriorityQueue."""
+        return len(self.entries)
+
+    def __contains__(self, key):
+        """Return True if the key is in PriorityQueue."""
+        return key in self.entries
+
+    def __getitem__(self, key):
+        """Returns the value associated with key in PriorityQueue.
+        Raises KeyError if key is not present."""
+        try:
+            return self.entries[key][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+
+    def __delitem__(self, key):
+        """Delete key, leaving its heap entry to be discarded lazily."""
+        try:
+            entry = self.entries.pop(key)
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
+        entry[2] = False
+        # Rebuild the heap when most of it is made of removed entries
+        if len(self.heap) > 2 * len(self.entries) + 32:
+            self.heap = [entry for entry in self.heap if entry[2]]
+            heapq.heapify(self.heap)
+
+
 # ______________________________________________________________________________
 # Useful Shorthands
 